@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas
+
+from dynamicfluency.helpers import normalize_word_form
+from dynamicfluency.word_frequencies import (
+    FrequencyLookup,
+    KEY_COLUMN,
+    format_value,
+    get_column_formats,
+    infer_column_type,
+)
+
+# File layout: MAGIC, the header length as little endian uint64, a JSON header,
+# and then all arrays, each aligned to ALIGNMENT bytes.
+MAGIC = b"DFSTORE2"
+ALIGNMENT = 8
+
+# The amount of rows fetched from the database at once while compiling.
+FETCH_SIZE = 10_000
+
+
+def _encode_keys(keys: List[str]) -> np.ndarray:
+    """A fixed-width UTF-8 byte array of the keys, as that is what can be binary searched"""
+    encoded = [key.encode("utf-8") for key in keys]
+    width = max((len(key) for key in encoded), default=0)
+    return np.array(encoded, dtype=f"S{max(width, 1)}")
+
+
+def _encode_column(
+    labels: List[Optional[str]],
+) -> Tuple[str, Optional[int], Dict[str, np.ndarray]]:
+    """The type and decimals of a column, see infer_column_type, and the arrays it is stored in.
+    Numbers are stored as int64 or float64, which give back exactly the same labels,
+    anything else as the offsets of the values in one UTF-8 blob.
+    """
+    nulls = np.array([label is None for label in labels], dtype=np.bool_)
+    sql_type, decimals = infer_column_type(labels)
+    if sql_type == "INTEGER":
+        values = np.array(
+            [0 if label is None else int(label) for label in labels],
+            dtype=np.int64,
+        )
+        return sql_type, decimals, {"values": values, "nulls": nulls}
+    if sql_type == "REAL":
+        values = np.array(
+            [0.0 if label is None else float(label) for label in labels],
+            dtype=np.float64,
+        )
+        return sql_type, decimals, {"values": values, "nulls": nulls}
+
+    encoded = [b"" if label is None else label.encode("utf-8") for label in labels]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return "TEXT", None, {"offsets": offsets, "values": blob, "nulls": nulls}
+
+
+def write_frequency_store(
+    rows: Iterable[Dict[str, Any]], *, columns: List[str], file: Path
+) -> None:
+    """Writes rows (dicts with at least a WordForm) to a frequency store file.
+    The rows are keyed on their normalised WordForm,
+    when multiple rows share a key, the first one is used, as in the database."""
+    by_key: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        if isinstance(row["WordForm"], str):
+            by_key.setdefault(normalize_word_form(row["WordForm"]), row)
+
+    # Sorted on the encoded bytes, as that is what is searched through.
+    keys = sorted(by_key.keys(), key=lambda key: key.encode("utf-8"))
+    arrays = {"keys": _encode_keys(keys)}
+    types = {}
+    for column in columns:
+        labels = [by_key[key][column] for key in keys]
+        labels = [None if label is None else str(label) for label in labels]
+        sql_type, decimals, column_arrays = _encode_column(labels)
+        types[column] = [sql_type, decimals]
+        for name, array in column_arrays.items():
+            arrays[f"{name}/{column}"] = array
+
+    header = {"columns": columns, "types": types, "size": len(keys), "arrays": {}}
+    offset = 0
+    for name, array in arrays.items():
+        offset += -offset % ALIGNMENT
+        header["arrays"][name] = {
+            "dtype": array.dtype.str,
+            "offset": offset,
+            "length": len(array),
+        }
+        offset += array.nbytes
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    start = len(MAGIC) + 8 + len(header_bytes)
+    start += -start % ALIGNMENT
+
+    # Written next to it and then moved over it, so a process that has the old file
+    # memory-mapped keeps reading the old file, instead of one that changes underneath it.
+    file = Path(file)
+    partial = file.with_name(f"{file.name}.partial")
+    with partial.open("wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.write(b"\0" * (start + header["arrays"][name]["offset"] - f.tell()))
+            f.write(array.tobytes())
+    os.replace(partial, file)
+
+
+def compile_frequency_store_from_db(
+    cursor: sqlite3.Cursor, *, table_name: str, file: Path
+) -> None:
+    """Compiles a table of the frequency database into a frequency store file
+    Every column gives the same labels as it would be looked up as from the database."""
+    formats = get_column_formats(cursor, table_name=table_name)
+    cursor.execute(f"SELECT * FROM {table_name};")
+    names = [description[0] for description in cursor.description]
+    columns = [name for name in names if name != KEY_COLUMN]
+
+    def fetch_rows() -> Iterator[Dict[str, Any]]:
+        while batch := cursor.fetchmany(FETCH_SIZE):
+            for row in batch:
+                yield {
+                    name: format_value(value, formats.get(name))
+                    for name, value in zip(names, row)
+                }
+
+    write_frequency_store(fetch_rows(), columns=columns, file=file)
+
+
+def compile_frequency_store_from_csv(file: Path, *, sep: str = ",", out: Path) -> None:
+    """Compiles a csv-like file, as add_frequency_dictionary takes it, into a frequency store file"""
+    df = pandas.read_csv(
+        file, sep=sep, index_col="WordForm", dtype=str, engine="python"
+    )
+    df = df.reset_index()
+    columns = list(df.columns)
+    rows = (
+        {column: (None if pandas.isna(value) else value) for column, value in row}
+        for row in (zip(columns, values) for values in df.itertuples(index=False))
+    )
+    write_frequency_store(rows, columns=columns, file=out)
+
+
+class FrequencyStore(FrequencyLookup):
+    """A read-only, memory-mapped frequency table, written by write_frequency_store.
+    Lookups are a binary search in the sorted keys, without any SQL involved.
+    As the file is memory-mapped, concurrent processes share it through the page cache.
+    """
+
+    def __init__(self, file: Path) -> None:
+        self.file = Path(file)
+        with self.file.open("rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(
+                    f"{file} is not a DynamicFluency frequency store, or one of an older version"
+                )
+            (header_length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_length).decode("utf-8"))
+
+        start = len(MAGIC) + 8 + header_length
+        start += -start % ALIGNMENT
+
+        self.columns: List[str] = header["columns"]
+        self.size: int = header["size"]
+        self.types: Dict[str, Tuple[str, Optional[int]]] = {
+            column: tuple(column_type)
+            for column, column_type in header["types"].items()
+        }
+        mapped = np.memmap(self.file, dtype=np.uint8, mode="r")
+        self._arrays: Dict[str, np.ndarray] = {}
+        for name, array in header["arrays"].items():
+            dtype = np.dtype(array["dtype"])
+            offset = start + array["offset"]
+            self._arrays[name] = mapped[
+                offset : offset + dtype.itemsize * array["length"]
+            ].view(dtype)
+
+    def close(self) -> None:
+        """Drops the arrays, the file is unmapped once nothing else refers to them"""
+        self._arrays = {}
+
+    def get_column_names(self) -> List[str]:
+        return list(self.columns)
+
+    def _find(self, keys: List[str]) -> Dict[str, int]:
+        """The index of each of the keys that is in the store"""
+        key_array = self._arrays["keys"]
+        encoded = [key.encode("utf-8") for key in keys]
+        # Longer keys would be truncated to a wrong match, and cannot be in here anyway.
+        searchable = [
+            (key, value)
+            for key, value in zip(keys, encoded)
+            if 0 < len(value) <= key_array.dtype.itemsize
+        ]
+        if not searchable or not self.size:
+            return {}
+
+        queries = np.array([value for _, value in searchable], dtype=key_array.dtype)
+        positions = np.searchsorted(key_array, queries)
+        found = {}
+        for (key, value), position in zip(searchable, positions):
+            if position < self.size and key_array[position] == value:
+                found[key] = int(position)
+        return found
+
+    def get_rows(
+        self, word_forms: Iterable[str], *, columns: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        if columns is None:
+            columns = self.columns
+
+        form_keys = {form: normalize_word_form(form) for form in set(word_forms)}
+        positions = self._find(sorted(set(form_keys.values())))
+
+        rows = {}
+        for form, key in form_keys.items():
+            if key not in positions:
+                continue
+            position = positions[key]
+            rows[form] = {
+                column: self._get_label(column, position) for column in columns
+            }
+        return rows
+
+    def _get_label(self, column: str, position: int) -> Optional[str]:
+        if self._arrays[f"nulls/{column}"][position]:
+            return None
+        sql_type, decimals = self.types[column]
+        values = self._arrays[f"values/{column}"]
+        if sql_type == "TEXT":
+            offsets = self._arrays[f"offsets/{column}"]
+            start, end = int(offsets[position]), int(offsets[position + 1])
+            return values[start:end].tobytes().decode("utf-8")
+        return format_value(values[position].item(), decimals)
@@ -1,6 +1,17 @@
-from .database_extensions import get_row_cursor
-from .filepath_extensions import get_local_glob
-from .conversions import split_pos_label, pos_tier_to_word_form_tier
+from .database_extensions import (
+    FORMAT_TABLE,
+    get_row_cursor,
+    open_read_only_database,
+    load_table_into_memory,
+    set_database_name,
+    read_database_name,
+)
+from .filepath_extensions import get_local_glob, get_cache_directory, get_file_version
+from .conversions import (
+    split_pos_label,
+    normalize_word_form,
+    pos_tier_to_word_form_tier,
+)
 from .textgridtier_extensions import (
     get_midpoint,
     replace_label,
@@ -9,16 +20,41 @@ from .textgridtier_extensions import (
     set_all_tiers_from_dict,
     make_lowercase_entrylist,
 )
+from .array_tier import EMPTY_ID, Vocabulary, ArrayTier, as_array_tier
+from .textgrid_files import (
+    TEXTGRID_FORMATS,
+    LazyTextgrid,
+    read_textgrid,
+    read_textgrid_tier,
+    write_textgrid,
+)
 
 __all__ = (
+    "FORMAT_TABLE",
     "get_midpoint",
     "get_row_cursor",
+    "open_read_only_database",
+    "load_table_into_memory",
+    "set_database_name",
+    "read_database_name",
     "get_local_glob",
+    "get_cache_directory",
+    "get_file_version",
     "split_pos_label",
+    "normalize_word_form",
     "pos_tier_to_word_form_tier",
     "replace_label",
     "entrylist_labels_to_string",
     "set_all_tiers_static",
     "set_all_tiers_from_dict",
     "make_lowercase_entrylist",
+    "EMPTY_ID",
+    "Vocabulary",
+    "ArrayTier",
+    "as_array_tier",
+    "TEXTGRID_FORMATS",
+    "LazyTextgrid",
+    "read_textgrid",
+    "read_textgrid_tier",
+    "write_textgrid",
 )
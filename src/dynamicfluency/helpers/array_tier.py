@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+from praatio.data_classes.interval_tier import IntervalTier
+
+from .conversions import split_pos_label
+
+# The id of the empty label, in every vocabulary.
+EMPTY_ID = 0
+
+
+class Vocabulary:
+    """Interns labels as integer ids, so labels can be compared as numbers.
+    Tiers that are compared to each other need to share the same vocabulary."""
+
+    def __init__(self) -> None:
+        self.labels: List[str] = [""]
+        self._ids: Dict[str, int] = {"": EMPTY_ID}
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def get_id(self, label: str) -> int:
+        """The id of the label, which is added when it was not in here yet"""
+        try:
+            return self._ids[label]
+        except KeyError:
+            self._ids[label] = len(self.labels)
+            self.labels.append(label)
+            return self._ids[label]
+
+    def get_ids(self, labels: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self.get_id(label) for label in labels), dtype=np.int32)
+
+    def get_known_ids(self, labels: Iterable[str]) -> np.ndarray:
+        """The ids of the labels that are in here, without adding the others"""
+        return np.array(
+            [self._ids[label] for label in labels if label in self._ids], dtype=np.int32
+        )
+
+    def get_labels(self, ids: np.ndarray) -> List[str]:
+        return [self.labels[i] for i in ids.tolist()]
+
+
+class ArrayTier:
+    """An interval tier as arrays: the start and end times, and the ids of the labels in a vocabulary.
+    For POS labels, word_ids and pos_ids have the ids of the word form and the tags of every label
+    (see split_pos_label). For labels without tags, the word form is the label itself,
+    and the tags are the empty label.
+    Only meant to be read, make a new IntervalTier with to_tier to write it.
+    """
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        label_ids: np.ndarray,
+        vocabulary: Vocabulary,
+        min_timestamp: float,
+        max_timestamp: float,
+    ) -> None:
+        self.name = name
+        self.starts = starts
+        self.ends = ends
+        self.label_ids = label_ids
+        self.vocabulary = vocabulary
+        self.min_timestamp = min_timestamp
+        self.max_timestamp = max_timestamp
+
+        # Every different label is only split once.
+        unique_ids, inverse = np.unique(label_ids, return_inverse=True)
+        unique_labels = vocabulary.get_labels(unique_ids)
+        self.word_ids: np.ndarray = vocabulary.get_ids(
+            split_pos_label(label) for label in unique_labels
+        )[inverse]
+        self.pos_ids: np.ndarray = vocabulary.get_ids(
+            split_pos_label(label, get_pos=True) for label in unique_labels
+        )[inverse]
+
+    def __len__(self) -> int:
+        return len(self.label_ids)
+
+    @classmethod
+    def from_tier(
+        cls, tier: IntervalTier, *, vocabulary: Optional[Vocabulary] = None
+    ) -> ArrayTier:
+        """Makes an ArrayTier from a praatio tier, with a new vocabulary if none is given"""
+        vocabulary = Vocabulary() if vocabulary is None else vocabulary
+        return cls(
+            name=tier.name,
+            starts=np.array(
+                [entry.start for entry in tier.entryList], dtype=np.float64
+            ),
+            ends=np.array([entry.end for entry in tier.entryList], dtype=np.float64),
+            label_ids=vocabulary.get_ids(entry.label for entry in tier.entryList),
+            vocabulary=vocabulary,
+            min_timestamp=tier.minTimestamp,
+            max_timestamp=tier.maxTimestamp,
+        )
+
+    @property
+    def labels(self) -> List[str]:
+        return self.vocabulary.get_labels(self.label_ids)
+
+    @property
+    def midpoints(self) -> np.ndarray:
+        return (self.starts + self.ends) / 2
+
+    def get_ignored(self, to_ignore: Iterable[str] = ()) -> np.ndarray:
+        """A mask of the empty labels, and the ones in to_ignore, either as a full label or as a word form"""
+        ignored = self.vocabulary.get_known_ids(to_ignore)
+        return (
+            (self.label_ids == EMPTY_ID)
+            | np.isin(self.label_ids, ignored)
+            | np.isin(self.word_ids, ignored)
+        )
+
+    def to_tier(
+        self,
+        *,
+        name: Optional[str] = None,
+        labels: Optional[List[Optional[str]]] = None,
+    ) -> IntervalTier:
+        """The praatio tier, optionally renamed and with other labels.
+        Where labels has None, the original label is kept."""
+        original = self.labels
+        if labels is not None:
+            original = [
+                label if new is None else new for label, new in zip(original, labels)
+            ]
+        # IntervalTier makes the Intervals itself.
+        return IntervalTier(
+            self.name if name is None else name,
+            list(zip(self.starts.tolist(), self.ends.tolist(), original)),
+            self.min_timestamp,
+            self.max_timestamp,
+        )
+
+
+def as_array_tier(tier: Union[IntervalTier, ArrayTier]) -> ArrayTier:
+    """The tier as an ArrayTier, converting praatio tiers"""
+    return tier if isinstance(tier, ArrayTier) else ArrayTier.from_tier(tier)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import unicodedata
 from itertools import chain
 
 from praatio.data_classes.textgrid_tier import TextgridTier
@@ -33,6 +34,17 @@ def split_pos_label(pos_label: str, *, get_pos: bool = False) -> str:
     return join.join(forms)
 
 
+def normalize_word_form(word_form: str) -> str:
+    """The form word forms are compared in: Unicode (NFC) normalised and casefolded.
+    Example:
+    "Aal" -> "aal",
+    "Straße" -> "strasse"
+    """
+    return unicodedata.normalize(
+        "NFC", unicodedata.normalize("NFC", word_form).casefold()
+    )
+
+
 def pos_tier_to_word_form_tier(
     pos_tier: TextgridTier, name: str = "WordForms"
 ) -> TextgridTier:
@@ -1,6 +1,19 @@
 from __future__ import annotations
 
+import sqlite3
+from pathlib import Path
 from sqlite3 import Connection, Cursor, Row
+from typing import Optional
+
+# Sizes for the read-only connections, the frequency tables are small enough to fit entirely.
+MMAP_SIZE = 256 * 1024 * 1024
+CACHE_SIZE_KIB = 64 * 1024
+
+# How many decimals the REAL columns are written with, see word_frequencies.infer_column_type
+FORMAT_TABLE = "DynamicFluencyColumnFormats"
+
+# A temporary table with the name of a database that has no file of its own, see set_database_name.
+DATABASE_NAME_TABLE = "DynamicFluencyDatabaseName"
 
 
 def get_row_cursor(connection: Connection) -> Cursor:
@@ -9,3 +22,80 @@ def get_row_cursor(connection: Connection) -> Cursor:
     """
     connection.row_factory = Row
     return connection.cursor()
+
+
+def set_database_name(connection: Connection, name: str) -> None:
+    """Names a database without a file of its own, such as an in-memory one.
+    The name is stored in the connection itself, so it goes away together with it."""
+    connection.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {DATABASE_NAME_TABLE} (name TEXT);"
+    )
+    connection.execute(f"DELETE FROM temp.{DATABASE_NAME_TABLE};")
+    connection.execute(f"INSERT INTO temp.{DATABASE_NAME_TABLE} VALUES (?);", [name])
+
+
+def read_database_name(connection: Connection) -> Optional[str]:
+    """The name set by set_database_name, or None"""
+    exists = connection.execute(
+        "SELECT COUNT(*) FROM sqlite_temp_master WHERE type = 'table' AND name = ?;",
+        [DATABASE_NAME_TABLE],
+    ).fetchone()[0]
+    if not exists:
+        return None
+    row = connection.execute(f"SELECT name FROM temp.{DATABASE_NAME_TABLE};").fetchone()
+    return None if row is None else row[0]
+
+
+def _tune_read_only(connection: Connection) -> None:
+    connection.execute(f"PRAGMA mmap_size = {MMAP_SIZE};")
+    connection.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB};")
+    connection.execute("PRAGMA query_only = ON;")
+
+
+def open_read_only_database(file: str, *, immutable: bool = False) -> Connection:
+    """Opens the database file read-only, tuned for many small lookups.
+    Only pass immutable when nothing can write to the file while it is open,
+    as SQLite then skips all locking and change detection.
+    """
+    uri = f"{Path(file).resolve().as_uri()}?mode=ro"
+    if immutable:
+        uri += "&immutable=1"
+    connection = sqlite3.connect(uri, uri=True)
+    _tune_read_only(connection)
+    return connection
+
+
+def load_table_into_memory(file: str, *, table_name: str) -> Connection:
+    """Copies a single table, with its indexes and column formats, from the database file into a new in-memory database.
+    Only useful for small tables, but the lookups afterwards do not touch the disk at all.
+    The in-memory database is named after the file, see set_database_name.
+    """
+    connection = sqlite3.connect("file::memory:", uri=True)
+    connection.execute(
+        "ATTACH DATABASE ? AS source;", [f"{Path(file).resolve().as_uri()}?mode=ro"]
+    )
+    connection.execute(
+        f"CREATE TABLE main.{table_name} AS SELECT * FROM source.{table_name};"
+    )
+    indexes = connection.execute(
+        "SELECT sql FROM source.sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL;",
+        [table_name],
+    ).fetchall()
+    for (sql,) in indexes:
+        connection.execute(sql)
+
+    # The formats of its columns are needed to get the same labels from it.
+    has_formats = connection.execute(
+        "SELECT COUNT(*) FROM source.sqlite_master WHERE type = 'table' AND name = ?;",
+        [FORMAT_TABLE],
+    ).fetchone()[0]
+    if has_formats:
+        connection.execute(
+            f"CREATE TABLE main.{FORMAT_TABLE} AS SELECT * FROM source.{FORMAT_TABLE} WHERE table_name = ?;",
+            [table_name],
+        )
+    connection.commit()
+    connection.execute("DETACH DATABASE source;")
+    set_database_name(connection, str(Path(file).resolve()))
+    _tune_read_only(connection)
+    return connection
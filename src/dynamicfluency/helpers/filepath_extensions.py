@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
 
 
 def get_local_glob(*paths: str, glob: str) -> List[Path]:
@@ -10,3 +11,23 @@ def get_local_glob(*paths: str, glob: str) -> List[Path]:
     The resolve is needed to be able to pass the path around as a string,
     which is needed for dependencies"""
     return list(Path().resolve().joinpath(*paths).glob(glob))
+
+
+def get_cache_directory(*paths: str) -> Path:
+    """The directory DynamicFluency keeps files in that can always be regenerated.
+    Set by DYNAMICFLUENCY_CACHE_DIR, otherwise the user's cache directory."""
+    if directory := os.environ.get("DYNAMICFLUENCY_CACHE_DIR"):
+        return Path(directory).joinpath(*paths)
+    if directory := os.environ.get("XDG_CACHE_HOME"):
+        return Path(directory).joinpath("dynamicfluency", *paths)
+    return Path.home().joinpath(".cache", "dynamicfluency", *paths)
+
+
+def get_file_version(file: str) -> Optional[Tuple[int, int]]:
+    """The modification time and size of the file, which change whenever it is written to.
+    None when it is not a file."""
+    try:
+        stat = os.stat(file)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,365 @@
+from __future__ import annotations
+
+import mmap
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from praatio.data_classes.interval_tier import IntervalTier
+from praatio.data_classes.point_tier import PointTier
+from praatio.data_classes.textgrid import Textgrid
+from praatio.data_classes.textgrid_tier import TextgridTier
+from praatio.utilities import errors
+from praatio.utilities.constants import (
+    INTERVAL_TIER,
+    MIN_INTERVAL_LENGTH,
+    POINT_TIER,
+)
+
+TEXTGRID_FORMATS = ("long_textgrid", "short_textgrid")
+
+_Buffer = Union[bytes, mmap.mmap]
+
+# Every field is matched in place, one entry at a time, instead of splitting the file up first.
+_NUMBER = r"(-?[\d.]+(?:[eE][-+]?\d+)?)"
+_STRING = r'"([^"]*(?:""[^"]*)*)"'
+
+_LONG_HEADER = re.compile(
+    rf"xmin ?= ?{_NUMBER}\s+xmax ?= ?{_NUMBER}\s+tiers\? ?<(exists|absent)>\s*"
+    r"(?:size ?= ?\d+\s*item ?\[\]:?)?"
+)
+_LONG_TIER = re.compile(
+    rf'\s*item ?\[\d+\]:\s*class ?= ?"(\w+)"\s*name ?= ?{_STRING}\s*'
+    rf"xmin ?= ?{_NUMBER}\s*xmax ?= ?{_NUMBER}\s*(?:intervals|points):? size ?= ?\d+"
+)
+_LONG_TIER_START = re.compile(r"item ?\[\d+\]:")
+_LONG_INTERVAL = re.compile(
+    rf"\s*intervals ?\[\d+\]:?\s*xmin ?= ?{_NUMBER}\s*xmax ?= ?{_NUMBER}\s*text ?= ?{_STRING}"
+)
+_LONG_POINT = re.compile(
+    rf"\s*points ?\[\d+\]:?\s*number ?= ?{_NUMBER}\s*mark ?= ?{_STRING}"
+)
+
+_SHORT_HEADER = re.compile(
+    rf'Object class = "TextGrid"\s+{_NUMBER}\s+{_NUMBER}\s+<(exists|absent)>(?:\s+\d+)?'
+)
+_SHORT_TIER = re.compile(rf'\s*"(\w+)"\s+{_STRING}\s+{_NUMBER}\s+{_NUMBER}\s+\d+')
+_SHORT_INTERVAL = re.compile(rf"\s*{_NUMBER}\s+{_NUMBER}\s+{_STRING}")
+_SHORT_POINT = re.compile(rf"\s*{_NUMBER}\s+{_STRING}")
+
+
+def _as_bytes(pattern: re.Pattern) -> re.Pattern:
+    """The same pattern for bytes, to search files without decoding them"""
+    return re.compile(pattern.pattern.encode("ascii"), pattern.flags & ~re.UNICODE)
+
+
+_LONG_HEADER_BYTES = _as_bytes(_LONG_HEADER)
+_LONG_TIER_BYTES = _as_bytes(_LONG_TIER)
+_LONG_TIER_START_BYTES = _as_bytes(_LONG_TIER_START)
+_SHORT_HEADER_BYTES = _as_bytes(_SHORT_HEADER)
+_SHORT_TIER_BYTES = _as_bytes(_SHORT_TIER)
+_SHORT_INTERVAL_BYTES = _as_bytes(_SHORT_INTERVAL)
+_SHORT_POINT_BYTES = _as_bytes(_SHORT_POINT)
+
+
+def _unescape(label: str) -> str:
+    return label.strip().replace('""', '"')
+
+
+def _get_tier_type(tier_class: str, *, file: Path) -> type:
+    if tier_class == INTERVAL_TIER:
+        return IntervalTier
+    if tier_class == POINT_TIER:
+        return PointTier
+    raise ValueError(f"{file} has a tier of an unknown class: {tier_class}")
+
+
+class LazyTextgrid:
+    """A long or short TextGrid file, of which only the tiers that are asked for are parsed.
+    Opening it only indexes where every tier is in the file, the file is searched
+    through memory-mapped and tiers are read back from it when they are needed,
+    so the other tiers are never decoded or kept in memory.
+    Of tiers with the same name, only the first can be read.
+    """
+
+    def __init__(self, file: Path) -> None:
+        self.file = Path(file)
+        # Praat saves UTF-16 (with a BOM) or UTF-8, UTF-16 files are kept in memory as UTF-8.
+        self._data: Optional[bytes] = None
+        self.tier_names: List[str] = []
+        self._spans: Dict[str, Tuple[int, int]] = {}
+
+        with self.file.open("rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError(f"{file} is not a TextGrid file")
+            if f.read(2) in (b"\xff\xfe", b"\xfe\xff"):
+                f.seek(0)
+                self._data = f.read().decode("utf-16").encode("utf-8")
+                self._index(self._data)
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    self._index(data)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._spans
+
+    def _index(self, data: _Buffer) -> None:
+        self._short = data.find(b"ooTextFile short") != -1 or data.find(b"item [") == -1
+        header = (_SHORT_HEADER_BYTES if self._short else _LONG_HEADER_BYTES).search(
+            data
+        )
+        if header is None:
+            raise ValueError(f"{self.file} is not a TextGrid file")
+        self.min_timestamp, self.max_timestamp = float(header[1]), float(header[2])
+        if header[3] == b"absent":
+            return
+
+        if self._short:
+            tiers = self._index_short_tiers(data, header.end())
+        else:
+            tiers = self._index_long_tiers(data, header.end())
+        for name, span in tiers:
+            self.tier_names.append(name)
+            self._spans.setdefault(name, span)
+
+    def _index_long_tiers(
+        self, data: _Buffer, position: int
+    ) -> Iterator[Tuple[str, Tuple[int, int]]]:
+        """Every tier starts with its item line, so the entries do not need to be looked at.
+        Item lines that are not followed by a tier header are in a label of the tier before.
+        """
+        tiers = [
+            tier
+            for match in _LONG_TIER_START_BYTES.finditer(data, position)
+            if (tier := _LONG_TIER_BYTES.match(data, match.start()))
+        ]
+        if data[position : tiers[0].start() if tiers else len(data)].strip():
+            raise ValueError(f"{self.file} is not readable after position {position}")
+        ends = [tier.start() for tier in tiers[1:]] + [len(data)]
+        for tier, end in zip(tiers, ends):
+            yield _unescape(tier[2].decode("utf-8")), (tier.start(), end)
+
+    def _index_short_tiers(
+        self, data: _Buffer, position: int
+    ) -> Iterator[Tuple[str, Tuple[int, int]]]:
+        """Short tiers can only be found by going over all the entries of the ones before.
+        As in praatio, the size of the tier is not relied on, every entry that follows belongs to it.
+        """
+        while tier := _SHORT_TIER_BYTES.match(data, position):
+            start, position = position, tier.end()
+            tier_type = _get_tier_type(tier[1].decode("utf-8"), file=self.file)
+            entry_pattern = (
+                _SHORT_INTERVAL_BYTES
+                if tier_type is IntervalTier
+                else _SHORT_POINT_BYTES
+            )
+            while entry := entry_pattern.match(data, position):
+                position = entry.end()
+            yield _unescape(tier[2].decode("utf-8")), (start, position)
+        if data[position:].strip():
+            raise ValueError(f"{self.file} is not readable after position {position}")
+
+    def _read(self, start: int, end: int) -> str:
+        if self._data is not None:
+            data = self._data[start:end]
+        else:
+            with self.file.open("rb") as f:
+                f.seek(start)
+                data = f.read(end - start)
+        return data.decode("utf-8").replace("\r\n", "\n")
+
+    def get_tier(self, name: str) -> TextgridTier:
+        """Parses the tier with this name, with its empty intervals.
+        Raises a KeyError when it is not in the file."""
+        text = self._read(*self._spans[name])
+        tier = (_SHORT_TIER if self._short else _LONG_TIER).match(text)
+        tier_type = _get_tier_type(tier[1], file=self.file)
+        if tier_type is IntervalTier:
+            entry_pattern = _SHORT_INTERVAL if self._short else _LONG_INTERVAL
+        else:
+            entry_pattern = _SHORT_POINT if self._short else _LONG_POINT
+
+        entries: List[tuple] = []
+        position = tier.end()
+        while entry := entry_pattern.match(text, position):
+            position = entry.end()
+            if tier_type is IntervalTier:
+                entries.append((float(entry[1]), float(entry[2]), _unescape(entry[3])))
+            else:
+                entries.append((float(entry[1]), _unescape(entry[2])))
+        if text[position:].strip():
+            raise ValueError(f"{self.file} is not readable in tier {name}")
+
+        return tier_type(name, entries, float(tier[3]), float(tier[4]))
+
+    def to_textgrid(self, tier_names: Optional[Iterable[str]] = None) -> Textgrid:
+        """A praatio Textgrid with the tiers in tier_names, or all of them if None,
+        in the order of the file. Names that are not in the file are left out."""
+        names = self._spans.keys() if tier_names is None else set(tier_names)
+        grid = Textgrid()
+        grid.minTimestamp, grid.maxTimestamp = self.min_timestamp, self.max_timestamp
+        for name in self._spans:
+            if name in names:
+                grid.addTier(self.get_tier(name))
+        return grid
+
+
+def read_textgrid(file: Path, *, tier_names: Optional[List[str]] = None) -> Textgrid:
+    """Reads a long or short TextGrid file, as praatio's openTextgrid(file, includeEmptyIntervals=True) does.
+    With tier_names, only those tiers are read into the grid, the others are skipped."""
+    return LazyTextgrid(file).to_textgrid(tier_names)
+
+
+def read_textgrid_tier(file: Path, name: str) -> TextgridTier:
+    """Reads just the one tier from a long or short TextGrid file, with its empty intervals.
+    Raises a KeyError when it is not in the file.
+    """
+    return LazyTextgrid(file).get_tier(name)
+
+
+def _format_number(number: float) -> str:
+    """The same as praatio's numToStr"""
+    whole = int(number)
+    if abs(number - whole) <= max(1e-14 * max(abs(number), abs(whole)), 0.0):
+        return "%d" % number
+    return repr(number)
+
+
+def _escape(label: str) -> str:
+    return label.replace('"', '""')
+
+
+def _fill_in_blanks(
+    entries: List[tuple], min_time: float, max_time: float
+) -> List[tuple]:
+    """Empty intervals in all the gaps of a sorted entry list, as praatio saves them"""
+    if not entries:
+        return [(min_time, max_time, "")]
+
+    filled = [entries[0]]
+    previous_end = float(entries[0][1])
+    for entry in entries[1:]:
+        if previous_end < float(entry[0]):
+            filled.append((previous_end, float(entry[0]), ""))
+        filled.append(entry)
+        previous_end = float(entry[1])
+
+    if float(filled[0][0]) < float(min_time):
+        raise errors.ParsingError(
+            "The entries are shorter than the min time specified in the textgrid."
+        )
+    if float(filled[0][0]) > float(min_time):
+        filled.insert(0, (min_time, filled[0][0], ""))
+    if max_time is not None:
+        if float(filled[-1][1]) > float(max_time):
+            raise errors.ParsingError(
+                "The entries are longer than the max time specified in the textgrid."
+            )
+        if float(filled[-1][1]) < float(max_time):
+            filled.append((filled[-1][1], max_time, ""))
+    return sorted(filled)
+
+
+def _remove_ultrashort_intervals(
+    entries: List[tuple], min_length: float, min_time: float
+) -> List[tuple]:
+    """Merges intervals shorter than min_length into the one before, as praatio saves them"""
+    kept: List[tuple] = []
+    for start, end, label in entries:
+        if end - start < min_length:
+            if kept:
+                kept[-1] = (kept[-1][0], end, kept[-1][2])
+        elif not kept and start != min_time:
+            kept.append((min_time, end, label))
+        else:
+            kept.append((start, end, label))
+
+    for i in range(len(kept) - 1):
+        gap = abs(kept[i][1] - kept[i + 1][0])
+        if 0 < gap < min_length:
+            kept[i] = (kept[i][0], kept[i + 1][0], kept[i][2])
+    return kept
+
+
+def _get_saved_entries(grid: Textgrid, tier: TextgridTier) -> List[tuple]:
+    entries = sorted(tier.entryList)
+    if tier.tierType == INTERVAL_TIER:
+        entries = _fill_in_blanks(entries, grid.minTimestamp, grid.maxTimestamp)
+        entries = sorted(
+            _remove_ultrashort_intervals(
+                entries, MIN_INTERVAL_LENGTH, grid.minTimestamp
+            )
+        )
+    return entries
+
+
+def _long_tier_lines(grid: Textgrid, number: int, tier: TextgridTier) -> Iterator[str]:
+    tab = " " * 4
+    entries = _get_saved_entries(grid, tier)
+    yield (
+        f"{tab}item [{number}]:\n"
+        f'{tab * 2}class = "{tier.tierType}" \n'
+        f'{tab * 2}name = "{_escape(tier.name)}" \n'
+        f"{tab * 2}xmin = {_format_number(tier.minTimestamp)} \n"
+        f"{tab * 2}xmax = {_format_number(tier.maxTimestamp)} \n"
+    )
+    if tier.tierType == INTERVAL_TIER:
+        yield f"{tab * 2}intervals: size = {len(entries)} \n"
+        for i, (start, end, label) in enumerate(entries, start=1):
+            yield (
+                f"{tab * 2}intervals [{i}]:\n"
+                f"{tab * 3}xmin = {_format_number(start)} \n"
+                f"{tab * 3}xmax = {_format_number(end)} \n"
+                f'{tab * 3}text = "{_escape(label)}" \n'
+            )
+    else:
+        yield f"{tab * 2}points: size = {len(entries)} \n"
+        for i, (time, label) in enumerate(entries, start=1):
+            yield (
+                f"{tab * 2}points [{i}]:\n"
+                f"{tab * 3}number = {_format_number(time)} \n"
+                f'{tab * 3}mark = "{_escape(label)}" \n'
+            )
+
+
+def _short_tier_lines(grid: Textgrid, tier: TextgridTier) -> Iterator[str]:
+    entries = _get_saved_entries(grid, tier)
+    yield (
+        f'"{tier.tierType}"\n"{_escape(tier.name)}"\n'
+        f"{_format_number(tier.minTimestamp)}\n{_format_number(tier.maxTimestamp)}\n"
+        f"{len(entries)}\n"
+    )
+    for *times, label in entries:
+        yield "".join(f"{_format_number(time)}\n" for time in times)
+        yield f'"{_escape(label)}"\n'
+
+
+def write_textgrid(
+    grid: Textgrid, file: Path, *, format: str = "long_textgrid"
+) -> None:
+    """Saves the grid byte for byte as grid.save(file, format=format, includeBlankSpaces=True) does,
+    writing every tier as it is formatted, instead of building the whole file in memory first.
+    """
+    if format not in TEXTGRID_FORMATS:
+        raise ValueError(f"Not a TextGrid format: {format}")
+
+    tiers = [grid.tierDict[name] for name in grid.tierNameList]
+    with open(file, "w", encoding="utf-8") as f:
+        f.write('File type = "ooTextFile"\nObject class = "TextGrid"\n\n')
+        if format == "long_textgrid":
+            f.write(
+                f"xmin = {_format_number(grid.minTimestamp)} \n"
+                f"xmax = {_format_number(grid.maxTimestamp)} \n"
+                f"tiers? <exists> \nsize = {len(tiers)} \nitem []: \n"
+            )
+            for number, tier in enumerate(tiers, start=1):
+                f.writelines(_long_tier_lines(grid, number, tier))
+        else:
+            f.write(
+                f"{_format_number(grid.minTimestamp)}\n"
+                f"{_format_number(grid.maxTimestamp)}\n"
+                f"<exists>\n{len(tiers)}\n"
+            )
+            for tier in tiers:
+                f.writelines(_short_tier_lines(grid, tier))
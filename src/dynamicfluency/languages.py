@@ -0,0 +1,16 @@
+# Kept apart from model_data, so the scripts can check the language
+# without importing spaCy and NLTK before handing their work to a worker.
+VALID_LANGUAGES = {
+    "zh": "Chinese",
+    "hr": "Croatian",
+    "nl": "Dutch",
+    "en": "English",
+    "fi": "Finnish",
+    "de": "German",
+    "it": "Italian",
+    "ko": "Korean",
+    "lt": "Lithuanian",
+    "pl": "Polish",
+    "ro": "Romanian",
+    "sv": "Swedish",
+}
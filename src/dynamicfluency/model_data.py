@@ -1,22 +1,16 @@
-from typing import Set
+import functools
+import os
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Optional, Tuple
 
 import nltk
 import spacy
+from nltk.tag.perceptron import PerceptronTagger
+from spacy.language import Language
 
-VALID_LANGUAGES = {
-    "zh": "Chinese",
-    "hr": "Croatian",
-    "nl": "Dutch",
-    "en": "English",
-    "fi": "Finnish",
-    "de": "German",
-    "it": "Italian",
-    "ko": "Korean",
-    "lt": "Lithuanian",
-    "pl": "Polish",
-    "ro": "Romanian",
-    "sv": "Swedish",
-}
+from dynamicfluency.helpers import get_cache_directory
+from dynamicfluency.languages import VALID_LANGUAGES
 
 NLTK_TAGGERS = {
     "en": "eng",
@@ -37,43 +31,63 @@ SPACY_MODELS = {
     "sv": "sv_core_news_sm",
 }
 
-NLTK_POS_TAGS = {
-    "CC",
-    "CD",
-    "DT",
-    "EX",
-    "FW",
-    "IN",
-    "JJ",
-    "JJR",
-    "JJS",
-    "LS",
-    "MD",
-    "NN",
-    "NNS",
-    "NNP",
-    "NNPS",
-    "PDT",
-    "WRB",
-    "WP$",
-    "WP",
-    "WDT",
-    "VBZ",
-    "VBP",
-    "VBN",
-    "VBG",
-    "VBD",
-    "VB",
-    "UH",
-    "TO",
-    "RP",
-    "RBS",
-    "RB",
-    "RBR",
-    "PRP",
-    "PRP$",
+# The spaCy pipeline components that are not needed for each stage, and are not loaded.
+# token.pos_ is set by the morphologizer, or by the attribute_ruler from the tagger's tags,
+# and token.dep_ and token.head by the parser.
+_SPACY_UNUSED_COMPONENTS = (
+    "senter",
+    "ner",
+    "entity_ruler",
+    "lemmatizer",
+    "trainable_lemmatizer",
+    "textcat",
+    "textcat_multilabel",
+    "spancat",
+)
+SPACY_EXCLUDED_COMPONENTS = {
+    "pos": ("parser", *_SPACY_UNUSED_COMPONENTS),
+    "parse": _SPACY_UNUSED_COMPONENTS,
 }
 
+NLTK_POS_TAGS = frozenset(
+    {
+        "CC",
+        "CD",
+        "DT",
+        "EX",
+        "FW",
+        "IN",
+        "JJ",
+        "JJR",
+        "JJS",
+        "LS",
+        "MD",
+        "NN",
+        "NNS",
+        "NNP",
+        "NNPS",
+        "PDT",
+        "WRB",
+        "WP$",
+        "WP",
+        "WDT",
+        "VBZ",
+        "VBP",
+        "VBN",
+        "VBG",
+        "VBD",
+        "VB",
+        "UH",
+        "TO",
+        "RP",
+        "RBS",
+        "RB",
+        "RBR",
+        "PRP",
+        "PRP$",
+    }
+)
+
 
 def assert_valid_language(lang: str) -> None:
     "A simple helper function to raise when non-valid language string is passed"
@@ -82,27 +96,169 @@ def assert_valid_language(lang: str) -> None:
         raise ValueError(f"lang must be one of: {VALID_LANGUAGES.keys()}")
 
 
-def load_spacy_model(model: str):
+def is_offline() -> bool:
+    """Whether models may not be downloaded, set with the DYNAMICFLUENCY_OFFLINE environment variable."""
+    return os.environ.get("DYNAMICFLUENCY_OFFLINE", "") not in ("", "0")
+
+
+def load_spacy_model(
+    model: str, *, exclude: Tuple[str, ...] = (), offline: Optional[bool] = None
+):
+    """Loads the model, downloading it if it is not installed and not running offline"""
     try:
-        return spacy.load(model)
+        return spacy.load(model, exclude=exclude)
     except OSError:
+        if is_offline() if offline is None else offline:
+            raise
         spacy.cli.download(model)
-        return spacy.load(model)
+        return spacy.load(model, exclude=exclude)
 
 
-def load_nltk_model(model: str):
-    if model == "eng":
-        nltk.download("punkt", quiet=True, halt_on_error=True)
-        nltk.download("averaged_perceptron_tagger", quiet=True, halt_on_error=True)
-    else:
+def assert_valid_stage(stage: str) -> None:
+    if stage not in SPACY_EXCLUDED_COMPONENTS.keys():
+        raise ValueError(f"stage must be one of: {SPACY_EXCLUDED_COMPONENTS.keys()}")
+
+
+def get_trimmed_model_path(model: str, *, stage: str = "pos") -> Optional[Path]:
+    """Where the copy of the model with only the components for stage is kept.
+    The installed version is part of the path, so an updated model is never mixed up with an old copy.
+    None when the model is not installed as a package."""
+    try:
+        version = metadata.version(model)
+    except metadata.PackageNotFoundError:
+        return None
+    return get_cache_directory("spacy", f"{model}-{version}-{stage}")
+
+
+def save_trimmed_model(model: str, *, stage: str = "pos") -> Optional[Path]:
+    """Writes the copy of the model with only the components stage needs,
+    which get_spacy_model then loads instead of the full model."""
+    assert_valid_stage(stage)
+    nlp = load_spacy_model(model, exclude=SPACY_EXCLUDED_COMPONENTS[stage])
+    if (path := get_trimmed_model_path(model, stage=stage)) is not None:
+        nlp.to_disk(path)
+    return path
+
+
+@functools.lru_cache(maxsize=None)
+def get_spacy_model(model: str, stage: str = "pos") -> Language:
+    """Loads a spaCy model only once per process, without the components stage does not need.
+    Uses the trimmed copy written by save_trimmed_model when there is one."""
+    assert_valid_stage(stage)
+    path = get_trimmed_model_path(model, stage=stage)
+    if path is not None and path.joinpath("config.cfg").exists():
+        return spacy.load(path)
+    return load_spacy_model(model, exclude=SPACY_EXCLUDED_COMPONENTS[stage])
+
+
+def get_nltk_resources(model: str) -> Dict[str, str]:
+    """The NLTK resources needed for the model, as {name to download: path nltk.data.find finds}
+    Newer versions of NLTK use other (non-pickled) resources than older versions."""
+    if model != "eng":
         raise ValueError(f"Language {model} not supported by NLTK")
 
+    resources = {}
+    if hasattr(nltk.tokenize, "PunktTokenizer"):
+        resources["punkt_tab"] = "tokenizers/punkt_tab/english/"
+    else:
+        resources["punkt"] = "tokenizers/punkt/english.pickle"
+    if hasattr(PerceptronTagger, "load_from_json"):
+        resources["averaged_perceptron_tagger_eng"] = (
+            "taggers/averaged_perceptron_tagger_eng/"
+        )
+    else:
+        resources["averaged_perceptron_tagger"] = (
+            "taggers/averaged_perceptron_tagger/averaged_perceptron_tagger.pickle"
+        )
+    return resources
+
+
+def find_nltk_resources(model: str) -> Dict[str, Optional[str]]:
+    """Where each of the resources the model needs is installed, None if it is not.
+    Only looks on disk, never online."""
+    found = {}
+    for name, path in get_nltk_resources(model).items():
+        try:
+            found[name] = str(nltk.data.find(path))
+        except LookupError:
+            found[name] = None
+    return found
+
+
+@functools.lru_cache(maxsize=None)
+def load_nltk_model(model: str, *, offline: Optional[bool] = None) -> None:
+    """Makes sure the resources for the model are installed, downloading the missing ones.
+    Once they are, this is not checked again in the same process.
+    When running offline, raises a LookupError for missing resources instead."""
+    missing = [name for name, path in find_nltk_resources(model).items() if not path]
+    if not missing:
+        return
+
+    if is_offline() if offline is None else offline:
+        raise LookupError(
+            f"NLTK resources {missing} are not installed, and models cannot be downloaded offline. "
+            "Run download_models while online first."
+        )
+    for name in missing:
+        nltk.download(name, quiet=True, halt_on_error=True)
+
+
+@functools.lru_cache(maxsize=None)
+def get_nltk_tagger(model: str) -> PerceptronTagger:
+    """Loads the NLTK tagger for the model only once per process.
+    nltk.pos_tag would load it again on every call, on older versions of NLTK."""
+    load_nltk_model(model)
+    if hasattr(PerceptronTagger, "load_from_json"):
+        return PerceptronTagger(lang=model)
+    return PerceptronTagger()
+
+
+def get_model_version(lang: str) -> Optional[str]:
+    """The version of the tagging backend and model used for the language, without loading the model.
+    None when the model is not installed yet."""
+    assert_valid_language(lang)
+    if lang in NLTK_TAGGERS.keys():
+        return f"nltk-{nltk.__version__}"
+    model = SPACY_MODELS[lang]
+    try:
+        return f"spacy-{spacy.__version__}/{model}-{metadata.version(model)}"
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def get_installed_models(lang: str) -> Dict[str, Any]:
+    """What is installed for the language, as download_models --verify reports it"""
+    assert_valid_language(lang)
+    if lang in NLTK_TAGGERS.keys():
+        return {
+            "nltk": nltk.__version__,
+            "resources": find_nltk_resources(NLTK_TAGGERS[lang]),
+        }
+    model = SPACY_MODELS[lang]
+    try:
+        version = metadata.version(model)
+    except metadata.PackageNotFoundError:
+        version = None
+    return {
+        "spacy": spacy.__version__,
+        "model": model,
+        "version": version,
+        "trimmed": {
+            stage: str(path)
+            for stage in SPACY_EXCLUDED_COMPONENTS.keys()
+            if (path := get_trimmed_model_path(model, stage=stage)) is not None
+            if path.exists()
+        },
+    }
+
 
-def get_valid_tags(lang: str) -> Set[str]:
+@functools.lru_cache(maxsize=None)
+def get_valid_tags(lang: str) -> FrozenSet[str]:
+    """The tags the tagger for the language can give, only made once per language"""
     assert_valid_language(lang)
     if lang in NLTK_TAGGERS.keys():
         return NLTK_POS_TAGS
     elif lang in SPACY_MODELS.keys():
-        return {*spacy.glossary.GLOSSARY.keys()}
+        return frozenset(spacy.glossary.GLOSSARY.keys())
     else:
         raise ValueError(f"Unknown or unsuppoerted language: {lang}")
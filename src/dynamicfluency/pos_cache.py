@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from pathlib import Path
+from typing import List, Optional
+
+# Part of every key, to be changed whenever the tagging itself changes,
+# so nothing tagged by an older version is ever used.
+CACHE_VERSION = 2
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024
+
+
+class PosTagCache:
+    """An on-disk cache of the POS labels of whole tiers, keyed on everything the tagging depends on.
+    Each entry is a small zlib compressed file. When the cache is pruned,
+    the least recently used entries are removed until it fits in max_size bytes again.
+    """
+
+    def __init__(self, directory: Path, *, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(
+        labels: List[str],
+        *,
+        lang: str,
+        backend: str,
+        model_version: str,
+        pretokenized: bool = False,
+    ) -> str:
+        """The key of the tagging of labels, for the given language, backend and model version,
+        and whether the labels were tagged pretokenized
+        """
+        content = json.dumps(
+            [CACHE_VERSION, lang, backend, model_version, pretokenized, labels]
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory.joinpath(key[:2], f"{key}.json.z")
+
+    def get(self, key: str) -> Optional[List[str]]:
+        path = self._path(key)
+        try:
+            labels = json.loads(zlib.decompress(path.read_bytes()).decode("utf-8"))
+        except (OSError, ValueError, zlib.error):
+            self.misses += 1
+            return None
+        # The modification time is what is used to find the least recently used entries.
+        os.utime(path)
+        self.hits += 1
+        return labels
+
+    def put(self, key: str, labels: List[str]) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written to a temporary file first, so no other process ever reads half an entry.
+        fd, temporary = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(zlib.compress(json.dumps(labels).encode("utf-8")))
+        os.replace(temporary, path)
+
+    def prune(self) -> None:
+        """Removes the least recently used entries, until the cache is at most max_size bytes"""
+        if not self.directory.exists():
+            return
+        entries = []
+        for path in self.directory.glob("*/*.json.z"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
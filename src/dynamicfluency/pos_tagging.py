@@ -1,18 +1,24 @@
 from __future__ import annotations
 
-from typing import List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import nltk
+from spacy.language import Language
+from spacy.tokens import Doc
 from praatio.data_classes.interval_tier import IntervalTier
+from praatio.data_classes.textgrid import Textgrid
 from praatio.utilities.utils import Interval
 
 from dynamicfluency.helpers import entrylist_labels_to_string, make_lowercase_entrylist
+from dynamicfluency.pos_cache import PosTagCache
+from dynamicfluency.syntactic_analysis import make_dependency_syntax_grid
 from dynamicfluency.model_data import (
     NLTK_TAGGERS,
     SPACY_MODELS,
     assert_valid_language,
-    load_nltk_model,
-    load_spacy_model,
+    get_model_version,
+    get_nltk_tagger,
+    get_spacy_model,
 )
 
 
@@ -22,46 +28,318 @@ def generate_tags_from_entrylist(
     assert_valid_language(lang)
     text = entrylist_labels_to_string(entryList)
     if lang in NLTK_TAGGERS.keys():
-        load_nltk_model(NLTK_TAGGERS[lang])
+        tagger = get_nltk_tagger(NLTK_TAGGERS[lang])
         tokens: List[str] = nltk.word_tokenize(text)
-        return nltk.pos_tag(tokens=tokens, lang=NLTK_TAGGERS[lang])
+        return tagger.tag(tokens)
     elif lang in SPACY_MODELS.keys():
-        nlp = load_spacy_model(SPACY_MODELS[lang])
-        return [(token.text, token.pos_) for token in nlp(text)]
+        [(tags, _)] = _tag_with_spacy([entryList], lang=lang)
+        return tags
     else:
         raise ValueError(f"Unknown or unsupported language: {lang}")
 
 
-# Jankyness needed because the NLTK tokenise split sometimes splits words into smaller sub-sections
+def _make_doc(
+    nlp: Language,
+    entryList: List[Interval],
+    tokenized: Dict[str, List[Tuple[str, bool]]],
+) -> Doc:
+    """The same Doc nlp would make of the text of the entryList, but made from its labels directly.
+    Each different label is only tokenised once, to split off things like contractions,
+    with tokenized keeping the tokens and whether they are followed by a space."""
+    words: List[str] = []
+    spaces: List[bool] = []
+    for entry in entryList:
+        if not entry.label:
+            continue
+        if entry.label not in tokenized:
+            tokenized[entry.label] = [
+                (token.text, bool(token.whitespace_))
+                for token in nlp.tokenizer(entry.label)
+            ]
+        for word, space in tokenized[entry.label]:
+            words.append(word)
+            spaces.append(space)
+        spaces[-1] = True
+    if spaces:
+        spaces[-1] = False
+    return Doc(nlp.vocab, words=words, spaces=spaces)
+
+
+def _pipe_docs(
+    entryLists: List[List[Interval]],
+    *,
+    lang: str,
+    stage: str = "pos",
+    batch_size: int = 64,
+    n_process: int = 1,
+    pretokenized: bool = False,
+) -> Iterator[Doc]:
+    """The Docs of the texts of each of the entryLists, made by the model loaded for stage.
+    With pretokenized, the Docs are made from the labels, and nlp only runs its pipeline components.
+    """
+    nlp = get_spacy_model(SPACY_MODELS[lang], stage)
+    if pretokenized:
+        tokenized: Dict[str, List[Tuple[str, bool]]] = {}
+        texts = (_make_doc(nlp, entryList, tokenized) for entryList in entryLists)
+    else:
+        texts = (entrylist_labels_to_string(entryList) for entryList in entryLists)
+    return nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+
+
+def _tag_with_spacy(
+    entryLists: List[List[Interval]],
+    *,
+    lang: str,
+    batch_size: int = 64,
+    n_process: int = 1,
+    pretokenized: bool = False,
+) -> List[Tuple[List[Tuple[str, str]], List[int]]]:
+    """The tags of each of the entryLists, and the character offset of each of those tags in its text"""
+    docs = _pipe_docs(
+        entryLists,
+        lang=lang,
+        batch_size=batch_size,
+        n_process=n_process,
+        pretokenized=pretokenized,
+    )
+    return [
+        ([(token.text, token.pos_) for token in doc], [token.idx for token in doc])
+        for doc in docs
+    ]
+
+
+def generate_tags_from_entrylists(
+    entryLists: List[List[Interval]],
+    *,
+    lang: str = "en",
+    batch_size: int = 64,
+    n_process: int = 1,
+) -> List[List[Tuple[str, str]]]:
+    """generate_tags_from_entrylist for many entryLists at once.
+    With NLTK, all texts are tagged as separate sentences by a single tagger.
+    With spaCy, all texts are streamed through nlp.pipe in batches of batch_size,
+    spread over n_process processes (-1 for one per CPU)."""
+    assert_valid_language(lang)
+    if lang in NLTK_TAGGERS.keys():
+        tagger = get_nltk_tagger(NLTK_TAGGERS[lang])
+        return tagger.tag_sents(
+            [
+                nltk.word_tokenize(entrylist_labels_to_string(entryList))
+                for entryList in entryLists
+            ]
+        )
+    elif lang in SPACY_MODELS.keys():
+        tagged = _tag_with_spacy(
+            entryLists, lang=lang, batch_size=batch_size, n_process=n_process
+        )
+        return [tags for tags, _ in tagged]
+    else:
+        raise ValueError(f"Unknown or unsupported language: {lang}")
+
+
+def _alignment_error(
+    index: int, entry: Interval, tags: List[Tuple[str, str]]
+) -> ValueError:
+    return ValueError(
+        f"Cannot align the tags to entry {index} ({entry.label!r}, {entry.start}-{entry.end}s): "
+        f"the tags there are {tags!r}"
+    )
+
+
 def align_tags(
-    tags: List[Tuple[str, str]], entryList: List[Interval]
+    tags: List[Tuple[str, str]],
+    entryList: List[Interval],
+    *,
+    offsets: Optional[List[int]] = None,
 ) -> List[Interval]:
-    """Make an aligned entrylist out of NLTK/SpaCy generated pos_tags and the entryList those were generated from."""
+    """Make an aligned entrylist out of NLTK/SpaCy generated pos_tags and the entryList those were generated from.
+    A word can get multiple tags, as the tokenisers sometimes split words into smaller sub-sections.
+
+    With offsets, the character offsets of the tags in the text made with entrylist_labels_to_string
+    (spaCy's token.idx), tags are matched to the words they fall in.
+    Otherwise, they are matched on their text, which needs to add up to the words exactly.
+    Raises a ValueError when the tags cannot be matched to a word."""
 
     new_entryList = []
-    for entry in entryList:
+    position = 0
+    end = -1
+    for index, entry in enumerate(entryList):
         if not entry.label:
             new_entryList.append(entry._replace(label=""))
             continue
-        word = ""
-        label = ""
-        while entry.label != word:
-            word += tags[0][0]
-            label = " ".join([label, "_".join(tags[0])])
-            tags.pop(0)
-        new_entryList.append(entry._replace(label=label.strip()))
+
+        first = position
+        end += len(entry.label) + 1
+        if offsets is not None:
+            while position < len(tags) and offsets[position] < end:
+                position += 1
+        else:
+            word = "".join(entry.label.split())
+            length = 0
+            while length < len(word) and position < len(tags):
+                length += len(tags[position][0])
+                position += 1
+            if "".join(tag[0] for tag in tags[first:position]) != word:
+                raise _alignment_error(index, entry, tags[first:position])
+
+        label = " ".join("_".join(tag) for tag in tags[first:position])
+        new_entryList.append(entry._replace(label=label))
     return new_entryList
 
 
+def get_token_entries(entryList: List[Interval], offsets: List[int]) -> List[int]:
+    """The index of the entry each token is in, from the character offsets of the tokens
+    in the text made with entrylist_labels_to_string, as align_tags matches them."""
+    token_entries = []
+    position = 0
+    end = -1
+    for index, entry in enumerate(entryList):
+        if not entry.label:
+            continue
+        end += len(entry.label) + 1
+        while position < len(offsets) and offsets[position] < end:
+            token_entries.append(index)
+            position += 1
+    return token_entries
+
+
 def make_pos_tier(
     words_tier: IntervalTier, *, name: str = "POStags", lang: str = "en"
 ) -> IntervalTier:
     """Makes a POS tagged tier from a textgrid tier with aligned words"""
+    [pos_tier] = make_pos_tiers([words_tier], name=name, lang=lang)
+    return pos_tier
+
+
+def make_pos_tiers(
+    words_tiers: List[IntervalTier],
+    *,
+    name: str = "POStags",
+    lang: str = "en",
+    batch_size: int = 64,
+    n_process: int = 1,
+    pretokenized: bool = False,
+    cache: Optional[PosTagCache] = None,
+) -> List[IntervalTier]:
+    """make_pos_tier for many tiers at once, tagging them all in batches.
+    See generate_tags_from_entrylists for batch_size and n_process.
+    With pretokenized, spaCy tags the words of the tiers as they are,
+    without tokenising the whole text again. This is not used with NLTK.
+    With a cache, tiers tagged before are taken from it, and the model is only loaded if anything is left.
+    """
+    assert_valid_language(lang)
+
+    lowercase_entryLists = [
+        make_lowercase_entrylist(words_tier.entryList) for words_tier in words_tiers
+    ]
+
+    keys: List[Optional[str]] = [None] * len(words_tiers)
+    labels: List[Optional[List[str]]] = [None] * len(words_tiers)
+    if cache is not None and (model_version := get_model_version(lang)) is not None:
+        backend = "nltk" if lang in NLTK_TAGGERS.keys() else "spacy"
+        for i, lowercase_entryList in enumerate(lowercase_entryLists):
+            keys[i] = cache.make_key(
+                [entry.label for entry in lowercase_entryList],
+                lang=lang,
+                backend=backend,
+                model_version=model_version,
+                pretokenized=pretokenized,
+            )
+            labels[i] = cache.get(keys[i])
+
+    to_tag = [i for i, tier_labels in enumerate(labels) if tier_labels is None]
+    to_tag_entryLists = [lowercase_entryLists[i] for i in to_tag]
+    if not to_tag:
+        tagged = []
+    elif lang in NLTK_TAGGERS.keys():
+        all_tags = generate_tags_from_entrylists(to_tag_entryLists, lang=lang)
+        tagged = [(tags, None) for tags in all_tags]
+    else:
+        tagged = _tag_with_spacy(
+            to_tag_entryLists,
+            lang=lang,
+            batch_size=batch_size,
+            n_process=n_process,
+            pretokenized=pretokenized,
+        )
+
+    for i, (tags, offsets) in zip(to_tag, tagged):
+        aligned = align_tags(tags, lowercase_entryLists[i], offsets=offsets)
+        labels[i] = [entry.label for entry in aligned]
+        if cache is not None and keys[i] is not None:
+            cache.put(keys[i], labels[i])
+
+    return [
+        words_tier.new(
+            name=name,
+            entryList=[
+                entry._replace(label=label)
+                for entry, label in zip(lowercase_entryList, tier_labels)
+            ],
+        )
+        for words_tier, lowercase_entryList, tier_labels in zip(
+            words_tiers, lowercase_entryLists, labels
+        )
+    ]
+
+
+def make_pos_tiers_and_syntax_grids(
+    words_tiers: List[IntervalTier],
+    *,
+    name: str = "POStags",
+    lang: str = "en",
+    batch_size: int = 64,
+    n_process: int = 1,
+    pretokenized: bool = False,
+) -> Tuple[List[IntervalTier], List[Textgrid]]:
+    """make_pos_tiers, plus a syntax grid for each tier made from spaCy's dependency parse
+    (see make_dependency_syntax_grid) instead of from the POS tags afterwards.
+    For languages tagged with spaCy, the tags and the parse come from the same pass.
+    For languages tagged with NLTK, the tags still come from NLTK, and spaCy only parses.
+    """
     assert_valid_language(lang)
 
-    lowercase_entryList = make_lowercase_entrylist(words_tier.entryList)
+    lowercase_entryLists = [
+        make_lowercase_entrylist(words_tier.entryList) for words_tier in words_tiers
+    ]
+    docs = list(
+        _pipe_docs(
+            lowercase_entryLists,
+            lang=lang,
+            stage="parse",
+            batch_size=batch_size,
+            n_process=n_process,
+            pretokenized=pretokenized,
+        )
+    )
 
-    tags = generate_tags_from_entrylist(lowercase_entryList, lang=lang)
-    tag_entryList = align_tags(tags, lowercase_entryList)
+    if lang in NLTK_TAGGERS.keys():
+        pos_tiers = make_pos_tiers(words_tiers, name=name, lang=lang)
+    else:
+        pos_tiers = [
+            words_tier.new(
+                name=name,
+                entryList=align_tags(
+                    [(token.text, token.pos_) for token in doc],
+                    lowercase_entryList,
+                    offsets=[token.idx for token in doc],
+                ),
+            )
+            for words_tier, doc, lowercase_entryList in zip(
+                words_tiers, docs, lowercase_entryLists
+            )
+        ]
 
-    return words_tier.new(name=name, entryList=tag_entryList)
+    syntax_grids = [
+        make_dependency_syntax_grid(
+            pos_tier,
+            token_entries=get_token_entries(
+                lowercase_entryList, [token.idx for token in doc]
+            ),
+            dependencies=[(token.dep_, token.pos_) for token in doc],
+        )
+        for pos_tier, doc, lowercase_entryList in zip(
+            pos_tiers, docs, lowercase_entryLists
+        )
+    ]
+    return pos_tiers, syntax_grids
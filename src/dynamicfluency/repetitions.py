@@ -1,71 +1,402 @@
 from __future__ import annotations
 
-from typing import List
+from typing import Dict, List, Optional, Tuple, Union
 
-import nltk
+import numpy as np
 from praatio.data_classes.interval_tier import IntervalTier
+from praatio.utilities.constants import Interval
 
-from dynamicfluency.helpers import entrylist_labels_to_string, split_pos_label
+from dynamicfluency.helpers import (
+    ArrayTier,
+    Vocabulary,
+    as_array_tier,
+    split_pos_label,
+)
+
+
+def get_counted_labels(
+    entryList: List[Interval], *, to_ignore: List[str] = []
+) -> List[Optional[str]]:
+    """The label of every entry, or None for the empty ones and the ones in to_ignore,
+    either as a full label or as a word form. Each different label is only parsed once.
+    """
+    ignored = set(to_ignore)
+    is_ignored: Dict[str, bool] = {}
+    labels = []
+    for entry in entryList:
+        if not entry.label:
+            labels.append(None)
+            continue
+        if entry.label not in is_ignored:
+            is_ignored[entry.label] = (entry.label in ignored) or (
+                split_pos_label(entry.label) in ignored
+            )
+        labels.append(None if is_ignored[entry.label] else entry.label)
+    return labels
+
+
+def _intern_labels(
+    labels: List[Optional[str]],
+) -> Tuple[Vocabulary, np.ndarray, np.ndarray]:
+    """A vocabulary, the ids of the labels that are not None, and a mask of which ones those are"""
+    vocabulary = Vocabulary()
+    counted = np.array([label is not None for label in labels], dtype=np.bool_)
+    ids = vocabulary.get_ids(label for label in labels if label is not None)
+    return vocabulary, ids, counted
+
+
+def _expand(values: List[str], counted: np.ndarray) -> List[Optional[str]]:
+    """The values back in place of the counted labels, None for the others"""
+    value = iter(values)
+    return [next(value) if is_counted else None for is_counted in counted.tolist()]
+
+
+def _format_repetitions(values: np.ndarray) -> List[str]:
+    return ["0" if value == 0 else str(value) for value in values.tolist()]
+
+
+def _format_frequencies(counts: np.ndarray, totals: np.ndarray) -> List[str]:
+    frequencies = counts / np.maximum(totals, 1)
+    return [
+        str(frequency) if total else "0"
+        for frequency, total in zip(frequencies.tolist(), totals.tolist())
+    ]
+
+
+def _get_previous_occurrences(ids: np.ndarray) -> np.ndarray:
+    """For every id, the position of its previous occurrence, or -1 for the first one"""
+    order = np.argsort(ids, kind="stable")
+    same = ids[order[1:]] == ids[order[:-1]]
+    previous = np.full(len(ids), -1, dtype=np.int64)
+    previous[order[1:][same]] = order[:-1][same]
+    return previous
+
+
+def _get_part_ids(unique_ids: np.ndarray, vocabulary: Vocabulary) -> np.ndarray:
+    """The ids of the space-separated parts of every label, a row per label padded with -1"""
+    parts = [
+        vocabulary.get_ids(label.split()) for label in vocabulary.get_labels(unique_ids)
+    ]
+    padded = np.full(
+        (len(parts), max((len(row) for row in parts), default=0)), -1, dtype=np.int64
+    )
+    for row, part_ids in zip(padded, parts):
+        row[: len(part_ids)] = part_ids
+    return padded
+
+
+def get_repetition_values(
+    ids: np.ndarray, *, max_cache: Optional[int] = 100
+) -> np.ndarray:
+    """For every id, 1/distance to its previous occurrence,
+    if that was less than max_cache back, and 0 otherwise."""
+    previous = _get_previous_occurrences(ids)
+    distances = np.arange(len(ids)) - previous
+    repeated = previous >= 0
+    if max_cache is not None:
+        repeated &= distances < max_cache
+
+    values = np.zeros(len(ids), dtype=np.float64)
+    values[repeated] = 1 / distances[repeated]
+    return values
+
+
+def _get_compared_ngrams(grams: np.ndarray, n: int) -> np.ndarray:
+    """For every n-gram, the start of the previous occurrence it is compared to, or -1.
+    An n-gram overlapping its previous occurrence is not compared,
+    and that previous occurrence stays the one to compare the next one to."""
+    previous = _get_previous_occurrences(grams)
+    starts = np.arange(len(grams))
+    if not np.any((previous >= 0) & (starts - previous < n)):
+        return previous
+
+    # Only repeated words, like "a a a", overlap, and need to be gone through in order.
+    last_seen: Dict[int, int] = {}
+    for start, gram in enumerate(grams.tolist()):
+        last = last_seen.get(gram)
+        if last is not None and start - last < n:
+            previous[start] = -1
+            continue
+        previous[start] = -1 if last is None else last
+        last_seen[gram] = start
+    return previous
+
+
+def get_ngram_repetition_values(
+    ids: np.ndarray,
+    *,
+    min_n: int = 2,
+    max_n: int = 4,
+    max_cache: Optional[int] = 100,
+) -> np.ndarray:
+    """For every id, the length of the longest repeated n-gram (min_n <= n <= max_n) it is part of, and 0 otherwise.
+    An n-gram is repeated when it ends less than max_cache ids after the end of its previous occurrence,
+    without the two overlapping.
+
+    Every n-gram is given an id of its own, so repeats are found just like single repetitions.
+    """
+    marks = np.zeros(len(ids), dtype=np.int64)
+    grams = ids.astype(np.int64)
+    for n in range(1, max_n + 1):
+        if n > len(ids):
+            break
+        if n > 1:
+            # The ids of the n-grams follow from the (n-1)-grams and the id after them.
+            _, grams = np.unique(
+                grams[:-1] * (int(ids.max()) + 1) + ids[n - 1 :], return_inverse=True
+            )
+        if n < min_n:
+            continue
+
+        previous = _get_compared_ngrams(grams, n)
+        starts = np.flatnonzero(previous >= 0)
+        if max_cache is not None:
+            starts = starts[starts - previous[starts] < max_cache]
+
+        # Marks start..start+n of every repeat, the longer n-grams come later and overwrite.
+        covered = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.add.at(covered, starts, 1)
+        np.add.at(covered, starts + n, -1)
+        marks[np.cumsum(covered[:-1]) > 0] = n
+    return marks
+
+
+def get_freqdist_counts(
+    ids: np.ndarray, vocabulary: Vocabulary
+) -> Tuple[np.ndarray, np.ndarray]:
+    """For every id, the count of its label among all the space-separated parts of the labels,
+    and the total amount of parts, as nltk.FreqDist would count them."""
+    unique_ids, inverse, occurrences = np.unique(
+        ids, return_inverse=True, return_counts=True
+    )
+    parts = _get_part_ids(unique_ids, vocabulary)
+    lengths = (parts >= 0).sum(axis=1)
+    part_counts = np.bincount(
+        parts[parts >= 0],
+        weights=np.repeat(occurrences, lengths),
+        minlength=len(vocabulary),
+    ).astype(np.int64)
+    total = int((occurrences * lengths).sum())
+    return part_counts[ids], np.full(len(ids), total, dtype=np.int64)
+
+
+def get_timed_repetition_values(
+    ids: np.ndarray, times: np.ndarray, *, window: float
+) -> np.ndarray:
+    """get_repetition_values, but with the previous occurrence needing to be at most window seconds
+    before the id, with the time of every id in times, instead of within a number of ids.
+    Only the last position of every id is kept while going through them, so this is linear.
+    """
+    values = [0.0] * len(ids)
+    times = times.tolist()
+    last_seen: Dict[int, int] = {}
+    for position, id in enumerate(ids.tolist()):
+        last = last_seen.get(id)
+        if last is not None and times[position] - times[last] <= window:
+            values[position] = 1 / (position - last)
+        last_seen[id] = position
+    return np.array(values, dtype=np.float64)
+
+
+def get_timed_freqdist_counts(
+    ids: np.ndarray, times: np.ndarray, vocabulary: Vocabulary, *, window: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """get_freqdist_counts, but only counting the ids at most window seconds before each id (and the id itself),
+    with the time of every id in times. The ids need to be in order of time.
+    The counts are kept for a window that moves along with the ids, so this is linear.
+    """
+    unique_ids = np.unique(ids)
+    parts: Dict[int, List[int]] = {
+        id: vocabulary.get_ids(label.split()).tolist()
+        for id, label in zip(unique_ids.tolist(), vocabulary.get_labels(unique_ids))
+    }
+
+    counts = []
+    totals = []
+    ids = ids.tolist()
+    times = times.tolist()
+    window_counts = [0] * len(vocabulary)
+    total = 0
+    first = 0
+    for position, id in enumerate(ids):
+        for part in parts[id]:
+            window_counts[part] += 1
+        total += len(parts[id])
+        # Every id counts the parts from first up to and including itself.
+        while first < position and times[first] < times[position] - window:
+            for part in parts[ids[first]]:
+                window_counts[part] -= 1
+            total -= len(parts[ids[first]])
+            first += 1
+        counts.append(window_counts[id])
+        totals.append(total)
+    return np.array(counts, dtype=np.int64), np.array(totals, dtype=np.int64)
+
+
+def get_repetitions(
+    labels: List[Optional[str]], *, max_cache: Optional[int] = 100
+) -> List[Optional[str]]:
+    """For every label, 1/distance to its previous occurrence, counted in labels that are not None,
+    if that was less than max_cache back, and 0 otherwise. None stays None."""
+    _, ids, counted = _intern_labels(labels)
+    values = get_repetition_values(ids, max_cache=max_cache)
+    return _expand(_format_repetitions(values), counted)
+
+
+def get_ngram_repetitions(
+    labels: List[Optional[str]],
+    *,
+    min_n: int = 2,
+    max_n: int = 4,
+    max_cache: Optional[int] = 100,
+) -> List[Optional[str]]:
+    """For every label, the length of the longest repeated n-gram (min_n <= n <= max_n) it is part of, and 0 otherwise.
+    An n-gram is repeated when it ends less than max_cache labels after the end of its previous occurrence,
+    without the two overlapping. Labels that are None are skipped over, and stay None.
+    """
+    _, ids, counted = _intern_labels(labels)
+    marks = get_ngram_repetition_values(
+        ids, min_n=min_n, max_n=max_n, max_cache=max_cache
+    )
+    return _expand([str(mark) for mark in marks.tolist()], counted)
+
+
+def get_freqdist(labels: List[Optional[str]]) -> List[Optional[str]]:
+    """For every label, its relative frequency among all the space-separated parts of the labels,
+    as nltk.FreqDist would give it. None stays None."""
+    vocabulary, ids, counted = _intern_labels(labels)
+    return _expand(_format_frequencies(*get_freqdist_counts(ids, vocabulary)), counted)
+
+
+def get_timed_repetitions(
+    labels: List[Optional[str]], times: List[float], *, window: float
+) -> List[Optional[str]]:
+    """get_repetitions, but with the previous occurrence needing to be at most window seconds
+    before the label, with the time of every label in times, instead of within a number of labels.
+    """
+    _, ids, counted = _intern_labels(labels)
+    values = get_timed_repetition_values(
+        ids, np.asarray(times, dtype=np.float64)[counted], window=window
+    )
+    return _expand(_format_repetitions(values), counted)
+
+
+def get_timed_freqdist(
+    labels: List[Optional[str]], times: List[float], *, window: float
+) -> List[Optional[str]]:
+    """get_freqdist, but only counting the labels at most window seconds before each label (and the label itself),
+    with the time of every label in times. The labels need to be in order of time."""
+    vocabulary, ids, counted = _intern_labels(labels)
+    counts = get_timed_freqdist_counts(
+        ids, np.asarray(times, dtype=np.float64)[counted], vocabulary, window=window
+    )
+    return _expand(_format_frequencies(*counts), counted)
+
+
+def _get_counted(
+    pos_tier: Union[IntervalTier, ArrayTier], to_ignore: List[str]
+) -> Tuple[ArrayTier, np.ndarray]:
+    """The tier as an ArrayTier, and a mask of the labels that are not empty or ignored"""
+    tier = as_array_tier(pos_tier)
+    return tier, ~tier.get_ignored(to_ignore)
 
 
 def make_repetitions_tier(
-    pos_tier: IntervalTier,
+    pos_tier: Union[IntervalTier, ArrayTier],
     *,
-    max_cache: int = 100,
+    max_cache: Optional[int] = 100,
     to_ignore: List[str] = [],
     name: str = "Repetitions",
 ) -> IntervalTier:
-    cache = []
-    repetitions_list = []
-
-    for entry in pos_tier.entryList:
-        if (
-            (not entry.label)
-            or (entry.label in to_ignore)
-            or (split_pos_label(entry.label) in to_ignore)
-        ):
-            repetitions_list.append(entry)
-            continue
+    """Makes a tier with, for every word, 1/distance to its previous occurrence in words,
+    if that was less than max_cache words back, and 0 otherwise.
+    max_cache=None reads back all the way to the start."""
+    tier, counted = _get_counted(pos_tier, to_ignore)
+    values = get_repetition_values(tier.label_ids[counted], max_cache=max_cache)
+    return tier.to_tier(name=name, labels=_expand(_format_repetitions(values), counted))
 
-        cache.insert(0, entry.label)
-        if len(cache) > max_cache:
-            cache.pop()
 
-        try:
-            repetitions = str(1 / cache.index(entry.label, 1))
-        except ValueError:
-            repetitions = "0"
+def make_freqdist_tier(
+    pos_tier: Union[IntervalTier, ArrayTier],
+    *,
+    to_ignore: List[str] = [],
+    name: str = "FreqDist",
+) -> IntervalTier:
+    """Makes a tier with, for every word, its relative frequency in the whole tier"""
+    tier, counted = _get_counted(pos_tier, to_ignore)
+    counts = get_freqdist_counts(tier.label_ids[counted], tier.vocabulary)
+    return tier.to_tier(
+        name=name, labels=_expand(_format_frequencies(*counts), counted)
+    )
 
-        repetitions_list.append(entry._replace(label=repetitions))
 
-    return pos_tier.new(name=name, entryList=repetitions_list)
+def make_ngram_repetitions_tier(
+    pos_tier: Union[IntervalTier, ArrayTier],
+    *,
+    min_n: int = 2,
+    max_n: int = 4,
+    max_cache: Optional[int] = 100,
+    to_ignore: List[str] = [],
+    name: str = "NgramRepetitions",
+) -> IntervalTier:
+    """Makes a tier with, for every word, the length of the longest repeated phrase of min_n to max_n words it is part of.
+    See get_ngram_repetition_values."""
+    tier, counted = _get_counted(pos_tier, to_ignore)
+    marks = get_ngram_repetition_values(
+        tier.label_ids[counted], min_n=min_n, max_n=max_n, max_cache=max_cache
+    )
+    return tier.to_tier(
+        name=name, labels=_expand([str(mark) for mark in marks.tolist()], counted)
+    )
 
 
-def make_freqdist_tier(
-    pos_tier: IntervalTier, *, to_ignore: List[str] = [], name: str = "FreqDist"
+def make_timed_repetitions_tier(
+    pos_tier: Union[IntervalTier, ArrayTier],
+    *,
+    window: float = 10.0,
+    to_ignore: List[str] = [],
+    name: str = "TimedRepetitions",
 ) -> IntervalTier:
-    processed_entryList = [
-        interval
-        for interval in pos_tier.entryList
-        if interval.label
-        if not interval.label in to_ignore
-        if not split_pos_label(interval.label) in to_ignore
-    ]
+    """make_repetitions_tier, but only counting previous occurrences that start at most window seconds
+    before the start of the word."""
+    tier, counted = _get_counted(pos_tier, to_ignore)
+    values = get_timed_repetition_values(
+        tier.label_ids[counted], tier.starts[counted], window=window
+    )
+    return tier.to_tier(name=name, labels=_expand(_format_repetitions(values), counted))
 
-    text = entrylist_labels_to_string(processed_entryList)
-    fdist = nltk.FreqDist(text.split())
-    freqdist_list = []
-
-    for entry in pos_tier.entryList:
-        if (
-            (not entry.label)
-            or (entry.label in to_ignore)
-            or (split_pos_label(entry.label) in to_ignore)
-        ):
-            freqdist_list.append(entry)
-            continue
 
-        frequency = str(fdist.freq(entry.label))
-        freqdist_list.append(entry._replace(label=frequency))
+def make_timed_freqdist_tier(
+    pos_tier: Union[IntervalTier, ArrayTier],
+    *,
+    window: float = 10.0,
+    to_ignore: List[str] = [],
+    name: str = "TimedFreqDist",
+) -> IntervalTier:
+    """make_freqdist_tier, but for every word only counting the words that start at most window seconds
+    before the start of the word, up to and including the word itself."""
+    tier, counted = _get_counted(pos_tier, to_ignore)
+    counts = get_timed_freqdist_counts(
+        tier.label_ids[counted], tier.starts[counted], tier.vocabulary, window=window
+    )
+    return tier.to_tier(
+        name=name, labels=_expand(_format_frequencies(*counts), counted)
+    )
+
 
-    return pos_tier.new(name=name, entryList=freqdist_list)
+def make_repetitions_and_freqdist_tiers(
+    pos_tier: Union[IntervalTier, ArrayTier],
+    *,
+    max_cache: Optional[int] = 100,
+    to_ignore: List[str] = [],
+    repetitions_name: str = "Repetitions",
+    freqdist_name: str = "FreqDist",
+) -> Tuple[IntervalTier, IntervalTier]:
+    """make_repetitions_tier and make_freqdist_tier, converting the tier only once for both"""
+    tier = as_array_tier(pos_tier)
+    return (
+        make_repetitions_tier(
+            tier, max_cache=max_cache, to_ignore=to_ignore, name=repetitions_name
+        ),
+        make_freqdist_tier(tier, to_ignore=to_ignore, name=freqdist_name),
+    )
@@ -6,9 +6,18 @@ import sys
 import csv
 import sqlite3
 from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 import pandas
 
+from dynamicfluency.helpers import normalize_word_form
+from dynamicfluency.word_frequencies import (
+    KEY_COLUMN,
+    add_word_form_key,
+    infer_column_type,
+    set_column_formats,
+)
+
 
 def parse_arguments() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -51,6 +60,20 @@ def parse_arguments() -> argparse.Namespace:
         default="fail",
         help='What to do if a table with the specified name already exists in the database. Either "fail" or "replace"',
     )
+    parser.add_argument(
+        "-n",
+        "--numeric",
+        action="store_true",
+        help="Store columns that only contain numbers as INTEGER or REAL, instead of as text.",
+    )
+    parser.add_argument(
+        "-c",
+        "--chunk_size",
+        nargs="?",
+        default=0,
+        type=int,
+        help="The amount of rows read and written at once, for files too large to fit in memory. 0, the default, reads the whole file into memory first.",
+    )
     args = parser.parse_args()
 
     if args.table_name.lower() == "default":
@@ -84,6 +107,180 @@ Error text generated by Python: \n""",
         sys.exit()
 
 
+def get_values(series: pandas.Series) -> List[Optional[str]]:
+    """The values of a column read with dtype=str, with None for missing ones"""
+    return [None if pandas.isna(value) else value for value in series]
+
+
+def convert_values(values: List[Optional[str]], sql_type: str) -> List[Any]:
+    """Converts the strings to the python type matching the SQL type"""
+    if sql_type == "INTEGER":
+        return [None if value is None else int(value) for value in values]
+    if sql_type == "REAL":
+        return [None if value is None else float(value) for value in values]
+    return values
+
+
+def convert_numeric_columns(
+    df: pandas.DataFrame,
+) -> Tuple[pandas.DataFrame, Dict[str, str], Dict[str, int]]:
+    """Converts the columns that can be stored as numbers without changing their labels.
+    Returns the converted dataframe, the SQL types of all columns,
+    and the amount of decimals of the REAL columns."""
+    df = df.copy()
+    types = {}
+    decimals = {}
+    for column in df.columns:
+        values = get_values(df[column])
+        types[column], places = infer_column_type(values)
+        df[column] = pandas.Series(
+            convert_values(values, types[column]), index=df.index, dtype=object
+        )
+        if types[column] == "REAL":
+            decimals[column] = places
+    return df, types, decimals
+
+
+def get_engine(sep: str) -> str:
+    """The C parser is a lot faster, but only supports single character seperators"""
+    return "c" if len(sep) == 1 else "python"
+
+
+def read_file_in_chunks(
+    file: str, *, sep: str = " ", chunk_size: int
+) -> Iterator[pandas.DataFrame]:
+    """Read file chunk by chunk, with the same constraints as read_file.
+    The WordForm column is always put first, as it is the index in read_file."""
+    # A tab passed as "\\t" works as regex, but that needs the slower python parser.
+    if sep == "\\t":
+        sep = "\t"
+    reader = pandas.read_csv(
+        file, sep=sep, dtype=str, engine=get_engine(sep), chunksize=chunk_size
+    )
+    for chunk in reader:
+        if "WordForm" not in chunk.columns:
+            raise ValueError('No column named "WordForm" found')
+        yield chunk[["WordForm"] + [c for c in chunk.columns if c != "WordForm"]]
+
+
+def infer_column_types_in_chunks(
+    chunks: Iterator[pandas.DataFrame],
+) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """The same as convert_numeric_columns, but only inferring the types, one chunk at a time.
+    Returns the SQL types of all columns, and the amount of decimals of the REAL columns.
+    """
+    inferred: Dict[str, Tuple[str, Optional[int]]] = {}
+    columns: List[str] = []
+    for chunk in chunks:
+        columns = list(chunk.columns[1:])
+        for column in columns:
+            values = get_values(chunk[column])
+            if all(value is None for value in values):
+                continue
+            column_type = infer_column_type(values)
+            if inferred.get(column, column_type) != column_type:
+                column_type = ("TEXT", None)
+            inferred[column] = column_type
+
+    types = {column: inferred.get(column, ("TEXT", None))[0] for column in columns}
+    decimals = {
+        column: places
+        for column, (sql_type, places) in inferred.items()
+        if sql_type == "REAL"
+    }
+    return types, decimals
+
+
+def import_file_in_chunks(
+    file: str,
+    *,
+    database: sqlite3.Connection,
+    table_name: str,
+    sep: str = " ",
+    chunk_size: int = 100_000,
+    if_exists: str = "fail",
+    numeric: bool = False,
+    progress: Callable[[int], None] = lambda rows: None,
+) -> None:
+    """Streams the file into a new table, chunk by chunk, so memory use stays bounded.
+    Unlike read_file, the C parser is used whenever the seperator is a single character.
+    All rows are inserted in one transaction, with journaling tuned for a bulk load,
+    and the indexes are only made after all data is in.
+    Results in the same table as to_sql on read_file and add_word_form_key would."""
+    quoted_table = f'"{table_name}"'
+
+    exists = database.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?;",
+        [table_name],
+    ).fetchone()[0]
+    if exists and if_exists == "fail":
+        raise ValueError(f"Table '{table_name}' already exists.")
+
+    header = next(read_file_in_chunks(file, sep=sep, chunk_size=1), None)
+    # Depending on the version of pandas, a file with only a header gives no chunks or an empty one.
+    if header is None or header.empty:
+        raise ValueError(f"{file} contains no rows")
+    if numeric:
+        types, decimals = infer_column_types_in_chunks(
+            read_file_in_chunks(file, sep=sep, chunk_size=chunk_size)
+        )
+    else:
+        types, decimals = {column: "TEXT" for column in header.columns[1:]}, {}
+
+    column_definitions = ", ".join(
+        ['"WordForm" TEXT']
+        + [f'"{column}" {sql_type}' for column, sql_type in types.items()]
+        + [f"{KEY_COLUMN} TEXT"]
+    )
+    placeholders = ", ".join("?" * (len(types) + 2))
+
+    old_journal_mode = database.execute("PRAGMA journal_mode;").fetchone()[0]
+    old_synchronous = database.execute("PRAGMA synchronous;").fetchone()[0]
+    old_isolation_level = database.isolation_level
+    database.execute("PRAGMA journal_mode = MEMORY;")
+    database.execute("PRAGMA synchronous = OFF;")
+    database.isolation_level = None
+
+    try:
+        database.execute("BEGIN;")
+        database.execute(f"DROP TABLE IF EXISTS {quoted_table};")
+        database.execute(f"CREATE TABLE {quoted_table} ({column_definitions});")
+
+        rows_done = 0
+        for chunk in read_file_in_chunks(file, sep=sep, chunk_size=chunk_size):
+            word_forms = get_values(chunk["WordForm"])
+            keys = [
+                None if form is None else normalize_word_form(form)
+                for form in word_forms
+            ]
+            columns = [
+                convert_values(get_values(chunk[column]), sql_type)
+                for column, sql_type in types.items()
+            ]
+            database.executemany(
+                f"INSERT INTO {quoted_table} VALUES ({placeholders});",
+                zip(word_forms, *columns, keys),
+            )
+            rows_done += len(chunk)
+            progress(rows_done)
+
+        database.execute(
+            f'CREATE INDEX "ix_{table_name}_WordForm" ON {quoted_table} ("WordForm");'
+        )
+        database.execute("COMMIT;")
+    except BaseException:
+        if database.in_transaction:
+            database.execute("ROLLBACK;")
+        raise
+    finally:
+        database.isolation_level = old_isolation_level
+        database.execute(f"PRAGMA journal_mode = {old_journal_mode};")
+        database.execute(f"PRAGMA synchronous = {old_synchronous};")
+
+    add_word_form_key(database, table_name=table_name, refresh=False)
+    set_column_formats(database, table_name=table_name, decimals=decimals)
+
+
 def main():
     # Allow for reading very big files
     MAXSIZE = sys.maxsize
@@ -95,13 +292,44 @@ def main():
             MAXSIZE //= 2
 
     args: argparse.Namespace = parse_arguments()
+
+    if args.chunk_size > 0:
+        with sqlite3.connect(args.database_file) as database:
+            try:
+                import_file_in_chunks(
+                    args.dictionary_file,
+                    database=database,
+                    table_name=args.table_name,
+                    sep=args.seperator,
+                    chunk_size=args.chunk_size,
+                    if_exists=args.if_exists,
+                    numeric=args.numeric,
+                    progress=lambda rows: print(f"{rows} rows imported", flush=True),
+                )
+            except ValueError as error:
+                print(
+                    """Unable to import file (Make the word_forms in the specified file are in a column named \"WordForm\", and the table does not exist yet)
+
+Error text generated by Python: \n""",
+                    error,
+                )
+        return
+
     df: pandas.DataFrame = read_file(args.dictionary_file, sep=args.seperator)
 
+    types, decimals = None, {}
+    if args.numeric:
+        df, types, decimals = convert_numeric_columns(df)
+
     with sqlite3.connect(args.database_file) as database:
         try:
-            df.to_sql(args.table_name, database, if_exists=args.if_exists)
+            df.to_sql(args.table_name, database, if_exists=args.if_exists, dtype=types)
         except ValueError as error:
             print("Cannot write to SQL Database\n", error)
+            return
+
+        add_word_form_key(database, table_name=args.table_name)
+        set_column_formats(database, table_name=args.table_name, decimals=decimals)
 
 
 if __name__ == "__main__":
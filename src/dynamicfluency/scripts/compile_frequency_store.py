@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import sqlite3
+from pathlib import Path
+
+from dynamicfluency.frequency_store import (
+    compile_frequency_store_from_csv,
+    compile_frequency_store_from_db,
+)
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compiles a frequency dictionary into a read-only, memory-mapped frequency store"
+    )
+    requiredNamed = parser.add_argument_group("Required named arguments")
+
+    requiredNamed.add_argument(
+        "-o",
+        "--output_file",
+        help="The frequency store file to write.",
+        required=True,
+    )
+
+    parser.add_argument(
+        "-t",
+        "--table_name",
+        nargs="?",
+        help="Name of the database table to compile. Either this or a dictionary_file is needed",
+    )
+    parser.add_argument(
+        "-f",
+        "--dictionary_file",
+        nargs="?",
+        help='csv-like file to compile directly, as add_frequency_dictionary takes it. WordForms have to be in a column named "WordForm"',
+    )
+    parser.add_argument(
+        "-b",
+        "--database_file",
+        nargs="?",
+        default="databases/main.db",
+        help="File used for the SQLite Database.",
+    )
+    parser.add_argument(
+        "-s",
+        "--seperator",
+        nargs="?",
+        default=",",
+        help='Seperator used in the dictionary file. Tabs would be "\\t", commas ",", for example',
+    )
+    args = parser.parse_args()
+
+    if (args.table_name is None) == (args.dictionary_file is None):
+        parser.error("Exactly one of table_name and dictionary_file is needed")
+
+    if args.dictionary_file is not None and not Path(args.dictionary_file).exists():
+        parser.error(f"{args.dictionary_file} does not exist")
+
+    if args.table_name is not None and not Path(args.database_file).exists():
+        parser.error(f"{args.database_file} does not exist")
+
+    return args
+
+
+def main():
+    args: argparse.Namespace = parse_arguments()
+
+    if args.dictionary_file is not None:
+        compile_frequency_store_from_csv(
+            Path(args.dictionary_file), sep=args.seperator, out=Path(args.output_file)
+        )
+        return
+
+    with sqlite3.connect(args.database_file) as database:
+        compile_frequency_store_from_db(
+            database.cursor(),
+            table_name=args.table_name,
+            file=Path(args.output_file),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,7 @@ import os
 import argparse
 from pathlib import Path
 
-from praatio.data_classes.textgrid import Textgrid
-
-from dynamicfluency.aeneas_conversion import aeneas_tier_from_file
-from dynamicfluency.helpers import get_local_glob
+from dynamicfluency.worker import forward_to_worker
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -30,8 +27,11 @@ def parse_arguments() -> argparse.Namespace:
     return args
 
 
-def main():
-    args: argparse.Namespace = parse_arguments()
+def run(args: argparse.Namespace) -> None:
+    from praatio.data_classes.textgrid import Textgrid
+
+    from dynamicfluency.aeneas_conversion import aeneas_tier_from_file
+    from dynamicfluency.helpers import get_local_glob, write_textgrid
 
     word_alignments = get_local_glob(args.directory, glob="*.tokens.json")
     phrase_alignments = get_local_glob(args.directory, glob="*.phrases.json")
@@ -44,11 +44,18 @@ def main():
         alignment_grid.addTier(words_tier)
         alignment_grid.addTier(phrases_tier)
         name = str(words).replace(".tokens.json", ".alignment.TextGrid")
-        alignment_grid.save(name, format="long_textgrid", includeBlankSpaces=True)
+        write_textgrid(alignment_grid, name)
 
         os.remove(words)
         os.remove(phrases)
 
 
+def main():
+    args: argparse.Namespace = parse_arguments()
+    if forward_to_worker("dynamicfluency.scripts.convert_aeneas_to_textgrids", args):
+        return
+    run(args)
+
+
 if __name__ == "__main__":
     main()
@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import sys
 import argparse
+import json
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -19,6 +20,18 @@ def parse_arguments() -> argparse.Namespace:
         nargs="?",
         default="en",
     )
+    parser.add_argument(
+        "-t",
+        "--trimmed",
+        action="store_true",
+        help="Also save copies of the spaCy model with only the parts DynamicFluency uses, which load faster",
+    )
+    parser.add_argument(
+        "-v",
+        "--verify",
+        action="store_true",
+        help="Only check the models are installed, without downloading anything, and show what is",
+    )
 
     args = parser.parse_args()
 
@@ -55,9 +68,13 @@ def main():
         from dynamicfluency.model_data import (
             NLTK_TAGGERS,
             SPACY_MODELS,
+            SPACY_EXCLUDED_COMPONENTS,
             assert_valid_language,
+            get_spacy_model,
             load_spacy_model,
             load_nltk_model,
+            get_installed_models,
+            save_trimmed_model,
         )
     except ImportError:
         sys.stderr.write("It appears DynamicFluency is not installed properly.")
@@ -67,18 +84,26 @@ def main():
     assert_valid_language(args.language)
 
     if args.language in NLTK_TAGGERS.keys():
-        load_nltk_model(NLTK_TAGGERS[args.language])
+        load_nltk_model(NLTK_TAGGERS[args.language], offline=args.verify or None)
         test_tokens = nltk.word_tokenize(test_sentence)
         print("NLTK: Tokeniser downloaded succesfully")
         _ = nltk.pos_tag(test_tokens)
         print("NLTK: Tagger downloaded succesfully")
     elif args.language in SPACY_MODELS.keys():
-        nlp = load_spacy_model(SPACY_MODELS[args.language])
+        nlp = load_spacy_model(SPACY_MODELS[args.language], offline=args.verify or None)
         _ = nlp(test_sentence)
         print("SPACY: Language downloaded succesfully")
+        if args.trimmed:
+            for stage in SPACY_EXCLUDED_COMPONENTS.keys():
+                path = save_trimmed_model(SPACY_MODELS[args.language], stage=stage)
+                _ = get_spacy_model(SPACY_MODELS[args.language], stage)(test_sentence)
+                print(f"SPACY: Trimmed model for {stage} saved to {path}")
     else:
         raise ValueError(f"Unknown or unsupported language {args.langauge}")
 
+    if args.verify:
+        print(json.dumps(get_installed_models(args.language), indent=4))
+
 
 if __name__ == "__main__":
     main()
@@ -6,8 +6,7 @@ import argparse
 from pathlib import Path
 import sqlite3
 
-from dynamicfluency.helpers import get_row_cursor
-from dynamicfluency.word_frequencies import get_column_names
+from dynamicfluency.worker import forward_to_worker
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -46,8 +45,9 @@ def parse_arguments() -> argparse.Namespace:
     return args
 
 
-def main():
-    args: argparse.Namespace = parse_arguments()
+def run(args: argparse.Namespace) -> None:
+    from dynamicfluency.helpers import get_row_cursor
+    from dynamicfluency.word_frequencies import get_column_names
 
     filepath = Path().resolve().joinpath(args.directory, "column_names.csv")
 
@@ -72,5 +72,12 @@ def main():
         csv.writer(f).writerow(names)
 
 
+def main():
+    args: argparse.Namespace = parse_arguments()
+    if forward_to_worker("dynamicfluency.scripts.get_database_columns", args):
+        return
+    run(args)
+
+
 if __name__ == "__main__":
     main()
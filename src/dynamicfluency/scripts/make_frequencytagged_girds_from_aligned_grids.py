@@ -2,14 +2,13 @@
 from __future__ import annotations
 
 import argparse
-import sqlite3
 from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 
-from praatio import textgrid as tg
-from praatio.data_classes.interval_tier import IntervalTier
+from dynamicfluency.worker import forward_to_worker
 
-from dynamicfluency.helpers import get_row_cursor, get_local_glob
-from dynamicfluency.word_frequencies import create_frequency_grid
+if TYPE_CHECKING:
+    from dynamicfluency.word_frequencies import FrequencyLookup
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -55,6 +54,26 @@ def parse_arguments() -> argparse.Namespace:
         default="",
         help="The Columns to read from the database table, seperated by commas",
     )
+    parser.add_argument(
+        "-s",
+        "--cache_size",
+        nargs="?",
+        default=100_000,
+        type=int,
+        help="The maximum amount of looked up word forms kept in memory between files. 0 disables the cache",
+    )
+    parser.add_argument(
+        "-f",
+        "--frequency_store",
+        nargs="?",
+        help="A frequency store made by compile_frequency_store to read from, instead of the database table",
+    )
+    parser.add_argument(
+        "-m",
+        "--in_memory",
+        action="store_true",
+        help="Copy the database table into memory before starting. Only useful for small tables",
+    )
 
     args: argparse.Namespace = parser.parse_args()
 
@@ -68,7 +87,10 @@ def parse_arguments() -> argparse.Namespace:
     if args.columns is not None and not "WordForm" in args.columns:
         args.columns.append("WordForm")
 
-    if not Path(args.database).exists():
+    if args.frequency_store is not None:
+        if not Path(args.frequency_store).exists():
+            parser.error(f"{args.frequency_store} does not exist")
+    elif not Path(args.database).exists():
         parser.error(f"{args.database} does not exist")
 
     if not Path(args.directory).exists():
@@ -77,8 +99,47 @@ def parse_arguments() -> argparse.Namespace:
     return args
 
 
-def main():
-    args: argparse.Namespace = parse_arguments()
+# The lookups opened in this process by their arguments, with the version of the file they read.
+_OPEN_LOOKUPS: Dict[tuple, Tuple[Optional[Tuple[int, int]], FrequencyLookup]] = {}
+
+
+def open_lookup(
+    database: str, table_name: str, frequency_store: Optional[str], in_memory: bool
+) -> FrequencyLookup:
+    """Opens the lookup only once per process, so a worker keeps re-using it,
+    until the file it reads changes, like when the table is imported again or the store is recompiled.
+    Takes absolute paths, as a worker runs the script from different directories."""
+    from dynamicfluency.frequency_store import FrequencyStore
+    from dynamicfluency.helpers import get_file_version
+    from dynamicfluency.word_frequencies import FREQUENCY_CACHE, SQLiteFrequencyLookup
+
+    arguments = (database, table_name, frequency_store, in_memory)
+    version = get_file_version(database if frequency_store is None else frequency_store)
+    if arguments in _OPEN_LOOKUPS:
+        opened_version, lookup = _OPEN_LOOKUPS[arguments]
+        if opened_version == version:
+            return lookup
+        lookup.close()
+
+    if frequency_store is not None:
+        lookup = FrequencyStore(Path(frequency_store))
+    else:
+        lookup = SQLiteFrequencyLookup.open(
+            database, table_name=table_name, in_memory=in_memory, cache=FREQUENCY_CACHE
+        )
+    _OPEN_LOOKUPS[arguments] = (version, lookup)
+    return lookup
+
+
+def run(args: argparse.Namespace) -> None:
+    from praatio.data_classes.interval_tier import IntervalTier
+
+    from dynamicfluency.helpers import (
+        get_local_glob,
+        read_textgrid_tier,
+        write_textgrid,
+    )
+    from dynamicfluency.word_frequencies import FREQUENCY_CACHE, create_frequency_grid
 
     if args.alignment == "maus":
         tokentier_name = "ORT-MAU"
@@ -90,29 +151,44 @@ def main():
         raise ValueError(f"Unknown alignment type found: {args.alignment}")
 
     alignment_files = get_local_glob(args.directory, glob="*.alignment.TextGrid")
+    FREQUENCY_CACHE.maxsize = args.cache_size
+    lookup = open_lookup(
+        str(Path(args.database).resolve()),
+        args.table_name,
+        (
+            str(Path(args.frequency_store).resolve())
+            if args.frequency_store is not None
+            else None
+        ),
+        args.in_memory,
+    )
 
     for file in alignment_files:
-        alignment_grid = tg.openTextgrid(str(file), includeEmptyIntervals=True)
-
         if not isinstance(
-            tier := alignment_grid.tierDict[tokentier_name], IntervalTier
+            tier := read_textgrid_tier(file, tokentier_name), IntervalTier
         ):
             raise ValueError("Cannot read alignment: Not an interval tier")
 
-        with sqlite3.connect(args.database) as connection:
-            cursor = get_row_cursor(connection)
-            frequency_grid = create_frequency_grid(
-                word_form_tier=tier,
-                cursor=cursor,
-                table_name=args.table_name,
-                to_ignore=args.to_ignore,
-                columns=args.columns,
-            )
+        frequency_grid = create_frequency_grid(
+            word_form_tier=tier,
+            lookup=lookup,
+            to_ignore=args.to_ignore,
+            columns=args.columns,
+        )
 
         frequency_grid.removeTier("WordForm")
 
         name = str(file).replace(".alignment.TextGrid", ".frequencies.TextGrid")
-        frequency_grid.save(name, format="long_textgrid", includeBlankSpaces=True)
+        write_textgrid(frequency_grid, name)
+
+
+def main():
+    args: argparse.Namespace = parse_arguments()
+    if forward_to_worker(
+        "dynamicfluency.scripts.make_frequencytagged_girds_from_aligned_grids", args
+    ):
+        return
+    run(args)
 
 
 if __name__ == "__main__":
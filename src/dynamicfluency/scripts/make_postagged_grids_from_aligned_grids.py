@@ -4,13 +4,8 @@ from __future__ import annotations
 from pathlib import Path
 import argparse
 
-from praatio import textgrid as tg
-from praatio.data_classes.textgrid import Textgrid
-from praatio.data_classes.interval_tier import IntervalTier
-from dynamicfluency.model_data import VALID_LANGUAGES
-
-from dynamicfluency.pos_tagging import make_pos_tier
-from dynamicfluency.helpers import get_local_glob
+from dynamicfluency.languages import VALID_LANGUAGES
+from dynamicfluency.worker import forward_to_worker
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -37,6 +32,48 @@ def parse_arguments() -> argparse.Namespace:
         nargs="?",
         default="en",
     )
+    parser.add_argument(
+        "-b",
+        "--batch_size",
+        type=int,
+        nargs="?",
+        default=64,
+        help="The amount of files spaCy tags at once",
+    )
+    parser.add_argument(
+        "-p",
+        "--n_process",
+        type=int,
+        nargs="?",
+        default=1,
+        help="The amount of processes spaCy tags with, -1 for one per CPU",
+    )
+    parser.add_argument(
+        "-t",
+        "--pretokenized",
+        action="store_true",
+        help="Let spaCy tag the aligned words as they are, instead of tokenising the whole text again",
+    )
+    parser.add_argument(
+        "-n",
+        "--no_cache",
+        action="store_true",
+        help="Always tag every file again, instead of re-using the tags of files that were tagged before",
+    )
+    parser.add_argument(
+        "-c",
+        "--cache_size",
+        type=int,
+        nargs="?",
+        default=100,
+        help="The maximum size of the cache of tagged files in MiB",
+    )
+    parser.add_argument(
+        "-s",
+        "--syntax",
+        action="store_true",
+        help="Also write the syntax grids, from spaCy's dependency parse made while tagging",
+    )
 
     args = parser.parse_args()
 
@@ -52,8 +89,21 @@ def parse_arguments() -> argparse.Namespace:
     return args
 
 
-def main():
-    args: argparse.Namespace = parse_arguments()
+def run(args: argparse.Namespace) -> None:
+    from praatio.data_classes.textgrid import Textgrid
+    from praatio.data_classes.interval_tier import IntervalTier
+
+    from dynamicfluency.pos_cache import PosTagCache
+    from dynamicfluency.pos_tagging import (
+        make_pos_tiers,
+        make_pos_tiers_and_syntax_grids,
+    )
+    from dynamicfluency.helpers import (
+        get_cache_directory,
+        get_local_glob,
+        read_textgrid_tier,
+        write_textgrid,
+    )
 
     if args.alignment == "maus":
         tokentier_name = "ORT-MAU"
@@ -66,21 +116,62 @@ def main():
 
     alignment_files = get_local_glob(args.directory, glob="*.alignment.TextGrid")
 
+    tiers = []
     for file in alignment_files:
-        alignment_grid = tg.openTextgrid(str(file), includeEmptyIntervals=True)
-
         if not isinstance(
-            tier := alignment_grid.tierDict[tokentier_name], IntervalTier
+            tier := read_textgrid_tier(file, tokentier_name), IntervalTier
         ):
             raise ValueError("Cannot read alignment: Not an interval tier")
-
-        tagged_tier = make_pos_tier(tier, lang=args.language)
-
+        tiers.append(tier)
+
+    if args.syntax:
+        # The parse is needed anyway, so the cache is not used.
+        tagged_tiers, syntax_grids = make_pos_tiers_and_syntax_grids(
+            tiers,
+            lang=args.language,
+            batch_size=args.batch_size,
+            n_process=args.n_process,
+            pretokenized=args.pretokenized,
+        )
+        for file, syntax_grid in zip(alignment_files, syntax_grids):
+            name = str(file).replace(".alignment.TextGrid", ".syntax.TextGrid")
+            write_textgrid(syntax_grid, name)
+    else:
+        cache = (
+            None
+            if args.no_cache
+            else PosTagCache(
+                get_cache_directory("pos_tags"), max_size=args.cache_size * 1024 * 1024
+            )
+        )
+
+        # The whole directory is tagged at once, so spaCy can batch and parallelise it.
+        tagged_tiers = make_pos_tiers(
+            tiers,
+            lang=args.language,
+            batch_size=args.batch_size,
+            n_process=args.n_process,
+            pretokenized=args.pretokenized,
+            cache=cache,
+        )
+        if cache is not None:
+            cache.prune()
+
+    for file, tagged_tier in zip(alignment_files, tagged_tiers):
         tag_grid = Textgrid()
         tag_grid.addTier(tagged_tier)
 
         name = str(file).replace(".alignment.TextGrid", ".pos_tags.TextGrid")
-        tag_grid.save(name, format="long_textgrid", includeBlankSpaces=True)
+        write_textgrid(tag_grid, name)
+
+
+def main():
+    args: argparse.Namespace = parse_arguments()
+    if forward_to_worker(
+        "dynamicfluency.scripts.make_postagged_grids_from_aligned_grids", args
+    ):
+        return
+    run(args)
 
 
 if __name__ == "__main__":
@@ -4,12 +4,7 @@ from __future__ import annotations
 import argparse
 from pathlib import Path
 
-from praatio import textgrid as tg
-from praatio.data_classes.textgrid import Textgrid
-from praatio.data_classes.interval_tier import IntervalTier
-
-from dynamicfluency.repetitions import make_repetitions_tier, make_freqdist_tier
-from dynamicfluency.helpers import get_local_glob
+from dynamicfluency.worker import forward_to_worker
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -29,7 +24,7 @@ def parse_arguments() -> argparse.Namespace:
         nargs="?",
         default=300,
         type=int,
-        help="The maximum amount of words the detector reads back to check for repetitions",
+        help="The maximum amount of words the detector reads back to check for repetitions, 0 for no maximum",
     )
     parser.add_argument(
         "-i",
@@ -37,40 +32,107 @@ def parse_arguments() -> argparse.Namespace:
         nargs="?",
         help="The words to ignore and not assign any value, seperated by commas.",
     )
+    parser.add_argument(
+        "-g",
+        "--ngram_range",
+        nargs=2,
+        type=int,
+        metavar=("MIN_N", "MAX_N"),
+        help="Also add a tier with the repeated phrases of MIN_N to MAX_N words",
+    )
+    parser.add_argument(
+        "-w",
+        "--window",
+        nargs="?",
+        type=float,
+        help="Also add repetitions and frequency distribution tiers that only look back this many seconds",
+    )
 
     args: argparse.Namespace = parser.parse_args()
-    args.to_ignore.split(",")
+    args.to_ignore = args.to_ignore.split(",") if args.to_ignore is not None else []
 
     if not Path(args.directory).exists():
         parser.error(f"{args.directory} does not exist")
 
+    if (
+        args.ngram_range is not None
+        and not 1 <= args.ngram_range[0] <= args.ngram_range[1]
+    ):
+        parser.error("The ngram range needs to be two increasing, positive numbers")
+
+    if args.window is not None and args.window < 0:
+        parser.error("The window cannot be negative")
+
     return args
 
 
-def main():
-    args: argparse.Namespace = parse_arguments()
+def run(args: argparse.Namespace) -> None:
+    from praatio.data_classes.textgrid import Textgrid
+    from praatio.data_classes.interval_tier import IntervalTier
+
+    from dynamicfluency.repetitions import (
+        make_ngram_repetitions_tier,
+        make_repetitions_and_freqdist_tiers,
+        make_timed_freqdist_tier,
+        make_timed_repetitions_tier,
+    )
+    from dynamicfluency.helpers import (
+        ArrayTier,
+        get_local_glob,
+        read_textgrid_tier,
+        write_textgrid,
+    )
 
     tagged_files = get_local_glob(args.directory, glob="*.pos_tags.TextGrid")
 
     for file in tagged_files:
-        tagged_grid = tg.openTextgrid(str(file), includeEmptyIntervals=True)
-
-        if not isinstance(tier := tagged_grid.tierDict["POStags"], IntervalTier):
+        if not isinstance(tier := read_textgrid_tier(file, "POStags"), IntervalTier):
             raise ValueError("Cannot read POStags: Not an interval tier")
+        # Converted once, all the tiers are made from the same arrays.
+        tier = ArrayTier.from_tier(tier)
 
-        repetition_tier = make_repetitions_tier(
+        repetition_tier, freqdist_tier = make_repetitions_and_freqdist_tiers(
             pos_tier=tier,
-            max_cache=args.max_read,
+            max_cache=args.max_read or None,
             to_ignore=args.to_ignore,
         )
-        freqdist_tier = make_freqdist_tier(pos_tier=tier, to_ignore=args.to_ignore)
 
         repetition_grid = Textgrid()
         repetition_grid.addTier(repetition_tier)
         repetition_grid.addTier(freqdist_tier)
+        if args.ngram_range is not None:
+            repetition_grid.addTier(
+                make_ngram_repetitions_tier(
+                    pos_tier=tier,
+                    min_n=args.ngram_range[0],
+                    max_n=args.ngram_range[1],
+                    max_cache=args.max_read or None,
+                    to_ignore=args.to_ignore,
+                )
+            )
+        if args.window is not None:
+            repetition_grid.addTier(
+                make_timed_repetitions_tier(
+                    pos_tier=tier, window=args.window, to_ignore=args.to_ignore
+                )
+            )
+            repetition_grid.addTier(
+                make_timed_freqdist_tier(
+                    pos_tier=tier, window=args.window, to_ignore=args.to_ignore
+                )
+            )
 
         name = str(file).replace(".pos_tags.TextGrid", ".repetitions.TextGrid")
-        repetition_grid.save(name, format="long_textgrid", includeBlankSpaces=True)
+        write_textgrid(repetition_grid, name)
+
+
+def main():
+    args: argparse.Namespace = parse_arguments()
+    if forward_to_worker(
+        "dynamicfluency.scripts.make_repetitionstagged_grids_from_postagged_grids", args
+    ):
+        return
+    run(args)
 
 
 if __name__ == "__main__":
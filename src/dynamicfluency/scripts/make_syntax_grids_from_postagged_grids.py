@@ -4,12 +4,8 @@ from __future__ import annotations
 import argparse
 from pathlib import Path
 
-from praatio import textgrid as tg
-from praatio.data_classes.interval_tier import IntervalTier
-
-from dynamicfluency.helpers import get_local_glob
-from dynamicfluency.syntactic_analysis import make_syntax_grid
-from dynamicfluency.model_data import VALID_LANGUAGES
+from dynamicfluency.languages import VALID_LANGUAGES
+from dynamicfluency.worker import forward_to_worker
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -46,21 +42,35 @@ def parse_arguments() -> argparse.Namespace:
     return args
 
 
-def main():
-    args: argparse.Namespace = parse_arguments()
+def run(args: argparse.Namespace) -> None:
+    from praatio.data_classes.interval_tier import IntervalTier
+
+    from dynamicfluency.helpers import (
+        get_local_glob,
+        read_textgrid_tier,
+        write_textgrid,
+    )
+    from dynamicfluency.syntactic_analysis import make_syntax_grid
 
     tagged_files = get_local_glob(args.directory, glob="*.pos_tags.TextGrid")
 
     for file in tagged_files:
-        tagged_grid = tg.openTextgrid(str(file), includeEmptyIntervals=True)
-
-        if not isinstance(tier := tagged_grid.tierDict["POStags"], IntervalTier):
+        if not isinstance(tier := read_textgrid_tier(file, "POStags"), IntervalTier):
             raise ValueError("Cannot read POStags: Not an interval tier")
 
         syntax_grid = make_syntax_grid(pos_tier=tier, lang=args.language)
 
         name = str(file).replace(".pos_tags.TextGrid", ".syntax.TextGrid")
-        syntax_grid.save(name, format="long_textgrid", includeBlankSpaces=True)
+        write_textgrid(syntax_grid, name)
+
+
+def main():
+    args: argparse.Namespace = parse_arguments()
+    if forward_to_worker(
+        "dynamicfluency.scripts.make_syntax_grids_from_postagged_grids", args
+    ):
+        return
+    run(args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import sqlite3
+from pathlib import Path
+
+from dynamicfluency.word_frequencies import add_word_form_key
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Adds the normalised, indexed WordForm key to frequency tables made by older versions of DynamicFluency"
+    )
+    parser.add_argument(
+        "-b",
+        "--database_file",
+        nargs="?",
+        default="databases/main.db",
+        help="File used for the SQLite Database.",
+    )
+    parser.add_argument(
+        "-t",
+        "--table_name",
+        nargs="?",
+        help="Name of the table to migrate. If left empty, all tables with a WordForm column are migrated.",
+    )
+    args = parser.parse_args()
+
+    if not Path(args.database_file).exists():
+        parser.error(f"{args.database_file} does not exist")
+
+    return args
+
+
+def get_frequency_tables(cursor: sqlite3.Cursor) -> list[str]:
+    """All the tables in the database that have a WordForm column"""
+    cursor.execute(
+        """SELECT m.name FROM sqlite_master AS m, PRAGMA_TABLE_INFO(m.name) AS p
+        WHERE m.type = 'table' AND p.name = 'WordForm';"""
+    )
+    return [name[0] for name in cursor.fetchall()]
+
+
+def main():
+    args: argparse.Namespace = parse_arguments()
+
+    with sqlite3.connect(args.database_file) as database:
+        if args.table_name is not None:
+            tables = [args.table_name]
+        else:
+            tables = get_frequency_tables(database.cursor())
+
+        for table_name in tables:
+            print(f"Migrating {table_name}")
+            add_word_form_key(database, table_name=table_name)
+
+
+if __name__ == "__main__":
+    main()
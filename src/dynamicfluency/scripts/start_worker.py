@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from dynamicfluency.worker import get_socket_path, request, serve
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Starts a long-running worker that the other scripts hand their work to, keeping models and databases loaded between calls."
+    )
+    parser.add_argument(
+        "-s",
+        "--socket",
+        nargs="?",
+        help="The socket to listen on. Defaults to the DYNAMICFLUENCY_WORKER_SOCKET environment variable, or a file in the temporary directory",
+    )
+    parser.add_argument(
+        "--stop",
+        action="store_true",
+        help="Stop the running worker instead of starting one",
+    )
+    args = parser.parse_args()
+    args.socket = get_socket_path() if args.socket is None else Path(args.socket)
+    return args
+
+
+def main():
+    args: argparse.Namespace = parse_arguments()
+
+    if args.stop:
+        if request({"command": "stop"}, socket_path=args.socket) is None:
+            sys.stderr.write(f"No worker running on {args.socket}\n")
+        return
+
+    print(f"Worker listening on {args.socket}", flush=True)
+    serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,58 @@
 from __future__ import annotations
 
-from typing import Set
+import functools
+import sys
+from typing import AbstractSet, List, Tuple, Union
 
+import numpy as np
 from praatio.data_classes.textgrid import Textgrid
 from praatio.data_classes.interval_tier import IntervalTier
 from praatio.data_classes.point_tier import PointTier
 from praatio.utilities.constants import Point
 
-from dynamicfluency.helpers import split_pos_label, get_midpoint
+from dynamicfluency.helpers import (
+    EMPTY_ID,
+    ArrayTier,
+    as_array_tier,
+    split_pos_label,
+)
 from dynamicfluency.model_data import get_valid_tags
 
 # This can be seen as a temporairy solution
-BASE_VERBS = {"VBZ", "VBP", "VBD", "VB", "ROOT", "VC", "VE", "VP", "VERB"}
-CLAUSE_VERBS = {"VBG", "VBN", "AUX", "MD", "VV"}
+BASE_VERBS = frozenset({"VBZ", "VBP", "VBD", "VB", "ROOT", "VC", "VE", "VP", "VERB"})
+CLAUSE_VERBS = frozenset({"VBG", "VBN", "AUX", "MD", "VV"})
+CLAUSE_TAGS = CLAUSE_VERBS | BASE_VERBS
 
+# The relations of the heads of clauses, and the tags of the heads of verb phrases,
+# except when they only are an auxiliary to another verb. Both the Universal Dependencies labels
+# and the ClearNLP labels of the English models, like "auxpass" for "aux:pass", are listed.
+CLAUSE_DEPENDENCIES = frozenset(
+    {
+        "root",
+        "ccomp",
+        "xcomp",
+        "advcl",
+        "acl",
+        "relcl",
+        "csubj",
+        "csubjpass",
+        "parataxis",
+    }
+)
+PHRASE_HEAD_TAGS = frozenset({"VERB", "AUX"})
+AUXILIARY_DEPENDENCIES = frozenset({"aux", "auxpass", "cop"})
 
-def label_contains_pos(lab: str, guard: Set[str]) -> bool:
-    return any(pos in guard for pos in split_pos_label(lab, get_pos=True).split())
+
+@functools.lru_cache(maxsize=65536)
+def parse_pos_label(lab: str) -> Tuple[str, ...]:
+    """The (interned) tags in a POS label, memoized as the same labels keep coming back.
+    Example:
+    "is_VB n't_RB" -> ("VB", "RB")"""
+    return tuple(sys.intern(pos) for pos in split_pos_label(lab, get_pos=True).split())
+
+
+def label_contains_pos(lab: str, guard: AbstractSet[str]) -> bool:
+    return not guard.isdisjoint(parse_pos_label(lab))
 
 
 def validate_pos(pos_tier: IntervalTier, lang: str) -> bool:
@@ -28,39 +64,90 @@ def validate_pos(pos_tier: IntervalTier, lang: str) -> bool:
     )
 
 
-def create_clause_point_tier(pos_tier: IntervalTier) -> PointTier:
-    entryList = [
-        Point(get_midpoint(interval), "")
-        for interval in pos_tier.entryList
-        if label_contains_pos(interval.label, CLAUSE_VERBS.union(BASE_VERBS))
-    ]
+def _make_point_tier(name: str, times: np.ndarray, tier: ArrayTier) -> PointTier:
     return PointTier(
-        name="Syntactic Clauses",
-        entryList=entryList,
-        minT=pos_tier.minTimestamp,
-        maxT=pos_tier.maxTimestamp,
+        name=name,
+        entryList=[Point(time, "") for time in times.tolist()],
+        minT=tier.min_timestamp,
+        maxT=tier.max_timestamp,
     )
 
 
-def create_phrase_point_tier(pos_tier: IntervalTier) -> PointTier:
-    entryList = [
-        Point(get_midpoint(interval), "")
-        for interval in pos_tier.entryList
-        if label_contains_pos(interval.label, BASE_VERBS)
-    ]
-    return PointTier(
-        name="Syntactic Phrases",
-        entryList=entryList,
-        minT=pos_tier.minTimestamp,
-        maxT=pos_tier.maxTimestamp,
-    )
+def _get_tag_masks(tier: ArrayTier, *guards: AbstractSet[str]) -> List[np.ndarray]:
+    """For every guard, a mask of the labels with any of its tags.
+    Every different label is only parsed once, and checked against all guards at the same time.
+    """
+    label_ids, inverse = np.unique(tier.label_ids, return_inverse=True)
+    contains = np.array(
+        [
+            [not guard.isdisjoint(tags) for guard in guards]
+            for tags in map(parse_pos_label, tier.vocabulary.get_labels(label_ids))
+        ],
+        dtype=np.bool_,
+    ).reshape(len(label_ids), len(guards))
+    contains &= (label_ids != EMPTY_ID)[:, np.newaxis]
+    return list(contains[inverse].T)
+
+
+def create_clause_point_tier(pos_tier: Union[IntervalTier, ArrayTier]) -> PointTier:
+    tier = as_array_tier(pos_tier)
+    [clauses] = _get_tag_masks(tier, CLAUSE_TAGS)
+    return _make_point_tier("Syntactic Clauses", tier.midpoints[clauses], tier)
+
 
+def create_phrase_point_tier(pos_tier: Union[IntervalTier, ArrayTier]) -> PointTier:
+    tier = as_array_tier(pos_tier)
+    [phrases] = _get_tag_masks(tier, BASE_VERBS)
+    return _make_point_tier("Syntactic Phrases", tier.midpoints[phrases], tier)
 
-def make_syntax_grid(pos_tier: IntervalTier, lang: str) -> Textgrid:
-    if not validate_pos(pos_tier, lang):
+
+def make_syntax_grid(pos_tier: Union[IntervalTier, ArrayTier], lang: str) -> Textgrid:
+    """Makes the grid with the clause and phrase point tiers, from the tags of the POS tier.
+    Raises a ValueError if any of the labels does not have a valid tag for the language.
+    """
+    tier = as_array_tier(pos_tier)
+    valid, clauses, phrases = _get_tag_masks(
+        tier, get_valid_tags(lang), CLAUSE_TAGS, BASE_VERBS
+    )
+    if np.any((tier.label_ids != EMPTY_ID) & ~valid):
         raise ValueError("POS_tier contains unreadable pos labels")
 
-    syntax_grid = Textgrid(pos_tier.minTimestamp, pos_tier.maxTimestamp)
-    syntax_grid.addTier(create_clause_point_tier(pos_tier))
-    syntax_grid.addTier(create_phrase_point_tier(pos_tier))
+    syntax_grid = Textgrid(tier.min_timestamp, tier.max_timestamp)
+    syntax_grid.addTier(
+        _make_point_tier("Syntactic Clauses", tier.midpoints[clauses], tier)
+    )
+    syntax_grid.addTier(
+        _make_point_tier("Syntactic Phrases", tier.midpoints[phrases], tier)
+    )
+    return syntax_grid
+
+
+def make_dependency_syntax_grid(
+    pos_tier: Union[IntervalTier, ArrayTier],
+    *,
+    token_entries: List[int],
+    dependencies: List[Tuple[str, str]],
+) -> Textgrid:
+    """Makes the grid with the clause and phrase point tiers from a dependency parse, instead of from the POS tags.
+    For every token, token_entries has the index of the interval in pos_tier it is in,
+    and dependencies its dependency relation and (universal) POS tag, as spaCy gives them.
+    A clause point is put at every clause head, and a phrase point at every verb that is not an auxiliary.
+    """
+    clause_entries = []
+    phrase_entries = []
+    for index, (dependency, pos) in zip(token_entries, dependencies):
+        # Subtypes, like "acl:relcl", count as their main relation.
+        relation = dependency.lower().split(":")[0]
+        if relation in CLAUSE_DEPENDENCIES:
+            clause_entries.append(index)
+        if pos in PHRASE_HEAD_TAGS and relation not in AUXILIARY_DEPENDENCIES:
+            phrase_entries.append(index)
+
+    tier = as_array_tier(pos_tier)
+    clauses = tier.midpoints[np.unique(np.array(clause_entries, dtype=np.int64))]
+    phrases = tier.midpoints[np.unique(np.array(phrase_entries, dtype=np.int64))]
+
+    syntax_grid = Textgrid(tier.min_timestamp, tier.max_timestamp)
+    syntax_grid.addTier(_make_point_tier("Syntactic Clauses", clauses, tier))
+    syntax_grid.addTier(_make_point_tier("Syntactic Phrases", phrases, tier))
     return syntax_grid
@@ -1,34 +1,294 @@
 from __future__ import annotations
 
+import itertools
 import sqlite3
-from typing import List, Optional
+import string
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
+import numpy as np
 from praatio.data_classes.textgrid import Textgrid
 from praatio.data_classes.interval_tier import IntervalTier
 
 from dynamicfluency.helpers import (
+    FORMAT_TABLE,
+    ArrayTier,
+    as_array_tier,
     set_all_tiers_static,
     set_all_tiers_from_dict,
-    split_pos_label,
+    normalize_word_form,
+    get_file_version,
+    get_row_cursor,
+    open_read_only_database,
+    load_table_into_memory,
+    set_database_name,
+    read_database_name,
 )
 
+# Stays below SQLITE_MAX_VARIABLE_NUMBER, which is 999 on older SQLite builds.
+LOOKUP_CHUNK_SIZE = 512
+
+# The normalised WordForm that is actually looked up, see add_word_form_key
+KEY_COLUMN = "WordFormKey"
+
+# The range of SQLite's INTEGER, larger numbers are stored as TEXT.
+INTEGER_MIN = -(2**63)
+INTEGER_MAX = 2**63 - 1
+
+# SQLite's LOWER() only folds ASCII characters, the lookups need to match that exactly.
+_SQLITE_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# Numbers the databases without a file, see get_database_name.
+_MEMORY_DATABASE_NUMBERS = itertools.count()
+
+
+class FrequencyCache:
+    """A least-recently-used cache for rows looked up by get_rows_from_db.
+    Forms that are not in the database are cached as well, as None.
+    The cache is only bound by the amount of entries, maxsize=None makes it unbounded.
+    """
+
+    NOT_CACHED = object()
+
+    def __init__(self, maxsize: Optional[int] = 100_000) -> None:
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self) -> Optional[int]:
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize: Optional[int]) -> None:
+        """Lowering maxsize removes the least recently used entries right away,
+        as the same cache is re-used by every run in a worker."""
+        self._maxsize = maxsize
+        self._trim()
+
+    def _trim(self) -> None:
+        if self._maxsize is None:
+            return
+        while len(self._entries) > max(self._maxsize, 0):
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        """The cached value, or FrequencyCache.NOT_CACHED"""
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return self.NOT_CACHED
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize is not None and self.maxsize <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._trim()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Shared by everything in this process that looks up frequencies, like the scripts.
+FREQUENCY_CACHE = FrequencyCache()
+
+
+def _sqlite_lower(text: str) -> str:
+    return text.translate(_SQLITE_LOWER)
+
+
+def _padded_chunk_size(size: int) -> int:
+    """The next power of two, so only a handful of different lookup queries exist,
+    and sqlite3 can re-use the prepared statements from its statement cache."""
+    return min(LOOKUP_CHUNK_SIZE, 1 << max(size - 1, 0).bit_length())
+
+
+def _normalize_or_none(word_form: Optional[str]) -> Optional[str]:
+    return normalize_word_form(word_form) if isinstance(word_form, str) else None
+
 
 def get_column_names(cursor: sqlite3.Cursor, *, table_name: str) -> List[str]:
-    """Returns all the column names from the specified table"""
+    """Returns all the column names from the specified table
+    The internal KEY_COLUMN is left out, as it does not contain frequency data."""
     cursor.execute("SELECT name FROM PRAGMA_TABLE_INFO(?);", [table_name])
-    return [name[0] for name in cursor.fetchall()]
+    return [name[0] for name in cursor.fetchall() if name[0] != KEY_COLUMN]
+
+
+def get_database_name(cursor: sqlite3.Cursor) -> Optional[str]:
+    """The file the cursor's main database is stored in.
+    Databases without one are named by set_database_name, load_table_into_memory names
+    them after the file they came from, others get a name unique within this process.
+    As the name is stored in the connection, a later connection cannot end up with it,
+    like it could with its id(). None for read-only databases without a name.
+    """
+    cursor.execute("PRAGMA database_list;")
+    for row in cursor.fetchall():
+        if row[1] == "main" and row[2]:
+            return row[2]
+
+    if (name := read_database_name(cursor.connection)) is not None:
+        return name
+    name = f":memory:{next(_MEMORY_DATABASE_NUMBERS)}"
+    try:
+        set_database_name(cursor.connection, name)
+    except sqlite3.OperationalError:
+        return None
+    return name
+
+
+def has_word_form_key(cursor: sqlite3.Cursor, *, table_name: str) -> bool:
+    """Whether the table has the normalised KEY_COLUMN, added by add_word_form_key"""
+    cursor.execute(
+        "SELECT COUNT(*) FROM PRAGMA_TABLE_INFO(?) WHERE name = ?;",
+        [table_name, KEY_COLUMN],
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def add_word_form_key(
+    connection: sqlite3.Connection, *, table_name: str, refresh: bool = True
+) -> None:
+    """Adds (or refreshes) the normalised KEY_COLUMN to a frequency table, with a unique index on it.
+    When multiple rows normalise to the same key, only the first one gets it,
+    as that is the row the old LIKE based lookup would have found.
+    Works on tables made by older versions as well, making it usable as a migration.
+    Without refresh, keys that are already in the column (e.g. from a bulk import) are kept.
+    """
+    cursor = connection.cursor()
+    if not has_word_form_key(cursor, table_name=table_name):
+        cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {KEY_COLUMN} TEXT;")
+        refresh = True
+
+    cursor.execute(f"DROP INDEX IF EXISTS ix_{table_name}_{KEY_COLUMN};")
+    if refresh:
+        connection.create_function(
+            "normalize_word_form", 1, _normalize_or_none, deterministic=True
+        )
+        cursor.execute(
+            f"UPDATE {table_name} SET {KEY_COLUMN} = normalize_word_form(WordForm);"
+        )
+    cursor.execute(
+        f"UPDATE {table_name} SET {KEY_COLUMN} = NULL WHERE rowid NOT IN "
+        f"(SELECT MIN(rowid) FROM {table_name} GROUP BY {KEY_COLUMN});"
+    )
+    cursor.execute(
+        f"CREATE UNIQUE INDEX ix_{table_name}_{KEY_COLUMN} ON {table_name} ({KEY_COLUMN});"
+    )
+    connection.commit()
+
+
+def infer_column_type(values: Iterable[Optional[str]]) -> Tuple[str, Optional[int]]:
+    """The SQLite type a column of (csv) strings can be stored as, without changing its labels.
+    That is "INTEGER" or "REAL" when every value converts back to exactly the same string,
+    INTEGER columns need to fit in 64 bits, as SQLite stores them, and REAL columns need to have a fixed number of decimals, which is returned as well.
+    Otherwise, it is "TEXT". Missing values (None) are ignored.
+    Example:
+    ["1", "20"] -> ("INTEGER", None),
+    ["0.30", "5.00"] -> ("REAL", 2),
+    ["0.3", "5.00"] -> ("TEXT", None)
+    """
+    values = [value for value in values if value is not None]
+    if not values:
+        return "TEXT", None
+
+    try:
+        if all(
+            str(int(value)) == value and INTEGER_MIN <= int(value) <= INTEGER_MAX
+            for value in values
+        ):
+            return "INTEGER", None
+    except ValueError:
+        pass
+
+    if "." not in values[0] or values[0].endswith("."):
+        return "TEXT", None
+    decimals = len(values[0]) - values[0].index(".") - 1
+    try:
+        if all(f"{float(value):.{decimals}f}" == value for value in values):
+            return "REAL", decimals
+    except ValueError:
+        pass
+
+    return "TEXT", None
+
+
+def set_column_formats(
+    connection: sqlite3.Connection, *, table_name: str, decimals: Dict[str, int]
+) -> None:
+    """Stores how many decimals the REAL columns of a table are formatted with"""
+    connection.execute(
+        f"CREATE TABLE IF NOT EXISTS {FORMAT_TABLE} "
+        "(table_name TEXT, column_name TEXT, decimals INTEGER, "
+        "PRIMARY KEY (table_name, column_name));"
+    )
+    connection.execute(
+        f"DELETE FROM {FORMAT_TABLE} WHERE table_name = ?;", [table_name]
+    )
+    connection.executemany(
+        f"INSERT INTO {FORMAT_TABLE} VALUES (?, ?, ?);",
+        [(table_name, column, places) for column, places in decimals.items()],
+    )
+    connection.commit()
+
+
+def get_column_formats(cursor: sqlite3.Cursor, *, table_name: str) -> Dict[str, int]:
+    """How many decimals the REAL columns of a table are formatted with, see set_column_formats"""
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?;",
+        [FORMAT_TABLE],
+    )
+    if not cursor.fetchone()[0]:
+        return {}
+    cursor.execute(
+        f"SELECT column_name, decimals FROM {FORMAT_TABLE} WHERE table_name = ?;",
+        [table_name],
+    )
+    return {column: decimals for column, decimals in cursor.fetchall()}
+
+
+def format_value(value: Any, decimals: Optional[int] = None) -> Optional[str]:
+    """The label of a value in the database, the same string it was imported as"""
+    if value is None:
+        return None
+    if isinstance(value, float) and decimals is not None:
+        return f"{value:.{decimals}f}"
+    return str(value)
 
 
 def make_empty_frequency_grid(
     *,
-    cursor: sqlite3.Cursor,
-    table_name: str,
+    cursor: Optional[sqlite3.Cursor],
+    table_name: Optional[str],
     base_tier: IntervalTier,
     columns: Optional[List[str]] = None,
 ) -> Textgrid:
     """Makes an "empty" frequency grid.
     This is a grid that has all the tiers initialised according to the column names of the databse,
     but does not have any values in those tiers, all of them being copies from the base.
+    The cursor and table_name are only used when no columns are given.
     """
     if columns is None:
         columns = get_column_names(cursor, table_name=table_name)
@@ -46,55 +306,292 @@ def set_labels_from_db(
     table_name: str,
     word_form: str,
     index: int,
+    cache: Optional[FrequencyCache] = None,
 ) -> None:
     """Sets the tiers of a textgrid with one tier for every databse column to their respecive entries at an index"""
-    word_form_parts = word_form.split("'")
-    set_all_tiers_static(grid, item="", index=index)
+    rows = get_rows_from_db(
+        cursor=cursor,
+        table_name=table_name,
+        word_forms=word_form.split("'"),
+        columns=list(grid.tierDict.keys()),
+        cache=cache,
+    )
+    set_labels_from_rows(grid=grid, rows=rows, word_form=word_form, index=index)
+
+
+class TableInfo(NamedTuple):
+    """What get_rows_from_db needs to know about a table, see get_table_info"""
+
+    database: Optional[str]
+    version: Optional[Tuple[int, int]]
+    columns: List[str]
+    key_column: str
+    to_key: Callable[[str], str]
+    formats: Dict[str, int]
+
+
+def get_table_info(cursor: sqlite3.Cursor, *, table_name: str) -> TableInfo:
+    """Looks up the database name, the columns, the key and the formats of a table at once,
+    so they can be re-used for all lookups in the same table.
+    The version is that of the database file (see get_file_version), None if it has none.
+    """
+    if has_word_form_key(cursor, table_name=table_name):
+        to_key, key_column = normalize_word_form, KEY_COLUMN
+    else:
+        to_key, key_column = _sqlite_lower, "LOWER(WordForm)"
+    database = get_database_name(cursor)
+    return TableInfo(
+        database=database,
+        version=None if database is None else get_file_version(database),
+        columns=get_column_names(cursor, table_name=table_name),
+        key_column=key_column,
+        to_key=to_key,
+        formats=get_column_formats(cursor, table_name=table_name),
+    )
+
+
+def get_rows_from_db(
+    *,
+    cursor: sqlite3.Cursor,
+    table_name: str,
+    word_forms: Iterable[str],
+    columns: Optional[List[str]] = None,
+    cache: Optional[FrequencyCache] = None,
+    table_info: Optional[TableInfo] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Looks up all the given word forms with as few queries as possible.
+    Every unique form is only looked up once, in chunks of LOOKUP_CHUNK_SIZE.
+    Tables with a KEY_COLUMN are matched on that index,
+    older tables fall back to a (slow) case-insensitive scan.
+    When given a cache, forms already in there are not queried at all.
+    The cache is keyed on the database (see get_database_name), the version of its file
+    and the table, so a file that is written to does not get the rows from before.
+    It is not used for read-only databases without a name.
+    Pass the table_info (see get_table_info) to not look it up again on every call.
+    Returns a dict from the form as given to its row, with only the requested columns,
+    formatted as labels by format_value. Forms that are not in the database are left out.
+    """
+    if table_info is None:
+        table_info = get_table_info(cursor, table_name=table_name)
+    if columns is None:
+        columns = table_info.columns
+    to_key, formats = table_info.to_key, table_info.formats
 
-    for part in word_form_parts:
+    form_keys = {form: to_key(form) for form in set(word_forms)}
+    if table_info.database is None:
+        cache = None
+
+    found = {}
+    if cache is not None:
+        cache_prefix = (table_info.database, table_info.version, table_name)
+        cache_columns = tuple(columns)
+        for key in set(form_keys.values()):
+            cached = cache.get((*cache_prefix, key, cache_columns))
+            if cached is not FrequencyCache.NOT_CACHED:
+                found[key] = cached
+
+    keys = sorted(set(form_keys.values()) - found.keys())
+    for i in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        chunk = keys[i : i + LOOKUP_CHUNK_SIZE]
+        # NULL never matches, so the padding does not change the result
+        chunk += [None] * (_padded_chunk_size(len(chunk)) - len(chunk))
+        placeholders = ", ".join("?" * len(chunk))
         cursor.execute(
-            f"SELECT DISTINCT * FROM {table_name} WHERE LOWER(WordForm) LIKE LOWER((?));",
-            [part],
+            f"SELECT * FROM {table_name} WHERE {table_info.key_column} IN ({placeholders});",
+            chunk,
         )
+        for row in cursor.fetchall():
+            if row["WordForm"] is not None:
+                found.setdefault(
+                    to_key(row["WordForm"]),
+                    {
+                        name: format_value(row[name], formats.get(name))
+                        for name in columns
+                    },
+                )
+
+    if cache is not None:
+        for key in keys:
+            cache.put((*cache_prefix, key, cache_columns), found.get(key))
+
+    return {
+        form: found[key]
+        for form, key in form_keys.items()
+        if found.get(key) is not None
+    }
+
+
+class FrequencyLookup(ABC):
+    """The interface create_frequency_grid uses to look up word forms,
+    implemented by SQLiteFrequencyLookup and frequency_store.FrequencyStore"""
+
+    @abstractmethod
+    def get_column_names(self) -> List[str]:
+        """All the columns that can be looked up"""
+
+    @abstractmethod
+    def get_rows(
+        self, word_forms: Iterable[str], *, columns: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """The same as get_rows_from_db: a dict from the forms as given to their rows,
+        with only the requested columns. Forms that cannot be found are left out."""
+
+    def close(self) -> None:
+        """Releases whatever the lookup holds on to"""
+
+
+class SQLiteFrequencyLookup(FrequencyLookup):
+    """Looks up word forms in a table of an SQLite3 database, see get_rows_from_db"""
+
+    def __init__(
+        self,
+        cursor: sqlite3.Cursor,
+        *,
+        table_name: str,
+        cache: Optional[FrequencyCache] = None,
+    ) -> None:
+        self.cursor = cursor
+        self.table_name = table_name
+        self.cache = cache
+        self._table_info: Optional[TableInfo] = None
 
+    @property
+    def table_info(self) -> TableInfo:
+        """Only looked up once, on first use"""
+        if self._table_info is None:
+            self._table_info = get_table_info(self.cursor, table_name=self.table_name)
+        return self._table_info
+
+    @classmethod
+    def open(
+        cls,
+        database: str,
+        *,
+        table_name: str,
+        in_memory: bool = False,
+        cache: Optional[FrequencyCache] = None,
+    ) -> SQLiteFrequencyLookup:
+        """Opens the database once, read-only, to be re-used for all lookups in a run.
+        With in_memory, only the table is copied into memory up front, for small dictionaries.
+        Close it again with close()
+        """
+        if in_memory:
+            connection = load_table_into_memory(database, table_name=table_name)
+        else:
+            connection = open_read_only_database(database)
+        return cls(get_row_cursor(connection), table_name=table_name, cache=cache)
+
+    def close(self) -> None:
+        self.cursor.connection.close()
+
+    def get_column_names(self) -> List[str]:
+        return list(self.table_info.columns)
+
+    def get_rows(
+        self, word_forms: Iterable[str], *, columns: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        return get_rows_from_db(
+            cursor=self.cursor,
+            table_name=self.table_name,
+            word_forms=word_forms,
+            columns=columns,
+            cache=self.cache,
+            table_info=self.table_info,
+        )
+
+
+def set_labels_from_rows(
+    *,
+    grid: Textgrid,
+    rows: Dict[str, Dict[str, Any]],
+    word_form: str,
+    index: int,
+) -> None:
+    """The same as set_labels_from_db, but with the rows already looked up by get_rows_from_db"""
+    set_all_tiers_static(grid, item="", index=index)
+
+    for part in word_form.split("'"):
         try:
-            row = cursor.fetchall()[0]
-        except IndexError:
+            row = rows[part]
+        except KeyError:
             set_all_tiers_static(grid, item="MISSING", index=index)
             return
         else:
             set_all_tiers_from_dict(grid, items=row, index=index, append=True)
 
 
+def get_labels_from_rows(
+    *, rows: Dict[str, Dict[str, Any]], word_form: str, columns: List[str]
+) -> List[str]:
+    """The labels of one word form, one for every column, from rows looked up by get_rows_from_db
+    Forms with apostrophes get the values of all parts, seperated by spaces,
+    just like set_labels_from_rows does."""
+    labels = [""] * len(columns)
+    for part in word_form.split("'"):
+        try:
+            row = rows[part]
+        except KeyError:
+            return ["MISSING"] * len(columns)
+        for i, column in enumerate(columns):
+            if row[column] is not None:
+                labels[i] = " ".join([labels[i], str(row[column])]).strip()
+    return labels
+
+
 def create_frequency_grid(
-    word_form_tier: IntervalTier,
+    word_form_tier: Union[IntervalTier, ArrayTier],
     *,
-    cursor: sqlite3.Cursor,
-    table_name: str,
+    cursor: Optional[sqlite3.Cursor] = None,
+    table_name: Optional[str] = None,
     to_ignore: Optional[List[str]] = None,
     columns: Optional[List[str]] = None,
+    batched: bool = True,
+    cache: Optional[FrequencyCache] = None,
+    lookup: Optional[FrequencyLookup] = None,
 ) -> Textgrid:
-    """Create frequency grid from database connection"""
+    """Create frequency grid from database connection, or any other FrequencyLookup
+    When batched, all unique word forms in the tier are looked up together up front,
+    instead of querying the database once for every unique word form.
+    Pass a FrequencyCache (e.g. FREQUENCY_CACHE) to re-use lookups between grids.
+    Every different word form only gets its labels once, and every tier is only made once at the end.
+    """
     to_ignore = [] if to_ignore is None else to_ignore
 
-    frequency_grid = make_empty_frequency_grid(
-        cursor=cursor, table_name=table_name, base_tier=word_form_tier, columns=columns
+    if lookup is None:
+        if cursor is None or table_name is None:
+            raise ValueError("Either a lookup or both a cursor and table_name needed")
+        lookup = SQLiteFrequencyLookup(cursor, table_name=table_name, cache=cache)
+
+    if columns is None:
+        columns = lookup.get_column_names()
+
+    tier = as_array_tier(word_form_tier)
+    looked_up = ~tier.get_ignored(to_ignore)
+    form_ids, inverse = np.unique(tier.label_ids[looked_up], return_inverse=True)
+    word_forms = tier.vocabulary.get_labels(form_ids)
+
+    if batched:
+        rows = lookup.get_rows(
+            {part for word_form in word_forms for part in word_form.split("'")},
+            columns=columns,
+        )
+
+    form_labels = []
+    for word_form in word_forms:
+        if not batched:
+            rows = lookup.get_rows(word_form.split("'"), columns=columns)
+        form_labels.append(
+            get_labels_from_rows(rows=rows, word_form=word_form, columns=columns)
+        )
+    # A row for every different word form, which is spread out over the tier for every column.
+    label_table = np.array(form_labels, dtype=object).reshape(
+        len(word_forms), len(columns)
     )
 
-    for i, entry in enumerate(word_form_tier.entryList):
-        if (
-            (not entry.label)
-            or (entry.label in to_ignore)
-            or (split_pos_label(entry.label) in to_ignore)
-        ):
-            set_all_tiers_static(frequency_grid, item="", index=i)
-        else:
-            set_labels_from_db(
-                cursor=cursor,
-                grid=frequency_grid,
-                table_name=table_name,
-                word_form=entry.label,
-                index=i,
-            )
+    frequency_grid = Textgrid()
+    for i, name in enumerate(columns):
+        labels = np.full(len(tier), "", dtype=object)
+        labels[looked_up] = label_table[inverse, i]
+        frequency_grid.addTier(tier.to_tier(name=name, labels=labels.tolist()))
 
     return frequency_grid
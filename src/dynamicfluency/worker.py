@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import argparse
+import contextlib
+import getpass
+import importlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import traceback
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Only these scripts can be run by the worker, all through their run(args) function.
+WORKER_SCRIPTS = {
+    "dynamicfluency.scripts.convert_aeneas_to_textgrids",
+    "dynamicfluency.scripts.get_database_columns",
+    "dynamicfluency.scripts.make_frequencytagged_girds_from_aligned_grids",
+    "dynamicfluency.scripts.make_postagged_grids_from_aligned_grids",
+    "dynamicfluency.scripts.make_repetitionstagged_grids_from_postagged_grids",
+    "dynamicfluency.scripts.make_syntax_grids_from_postagged_grids",
+}
+
+CONNECT_TIMEOUT = 1.0
+
+
+def get_socket_path() -> Path:
+    """The socket the worker listens on.
+    Can be set with the DYNAMICFLUENCY_WORKER_SOCKET environment variable."""
+    if path := os.environ.get("DYNAMICFLUENCY_WORKER_SOCKET"):
+        return Path(path)
+    return Path(tempfile.gettempdir(), f"dynamicfluency-{getpass.getuser()}.sock")
+
+
+def _send(connection: socket.socket, message: Dict[str, Any]) -> None:
+    connection.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def _receive(connection: socket.socket) -> Optional[Dict[str, Any]]:
+    with connection.makefile("rb") as f:
+        line = f.readline()
+    return json.loads(line) if line else None
+
+
+def request(
+    message: Dict[str, Any], *, socket_path: Optional[Path] = None
+) -> Optional[Dict[str, Any]]:
+    """Sends a single message to the worker, and returns its answer.
+    Returns None when no worker is running."""
+    socket_path = get_socket_path() if socket_path is None else socket_path
+    if not hasattr(socket, "AF_UNIX") or not socket_path.exists():
+        return None
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(CONNECT_TIMEOUT)
+        try:
+            connection.connect(str(socket_path))
+        except OSError:
+            return None
+        connection.settimeout(None)
+        _send(connection, message)
+        return _receive(connection)
+
+
+def forward_to_worker(script: str, args: argparse.Namespace) -> bool:
+    """Runs the script with already parsed arguments in the worker, if one is running.
+    Returns whether it did, so the caller can fall back to running it in this process.
+    """
+    response = request(
+        {"command": "run", "script": script, "args": vars(args), "cwd": os.getcwd()}
+    )
+    if response is None:
+        return False
+
+    sys.stdout.write(response["output"])
+    if response["error"] is not None:
+        sys.stderr.write(response["error"])
+        sys.exit(1)
+    return True
+
+
+def run_script(script: str, args: Dict[str, Any], cwd: str) -> Dict[str, Any]:
+    """Runs the script in this process, as if it was called from cwd.
+    Returns its printed output and, if it failed, the error."""
+    if script not in WORKER_SCRIPTS:
+        return {"output": "", "error": f"Not a DynamicFluency script: {script}\n"}
+
+    output = io.StringIO()
+    error = None
+    old_cwd = os.getcwd()
+    try:
+        os.chdir(cwd)
+        with contextlib.redirect_stdout(output):
+            importlib.import_module(script).run(argparse.Namespace(**args))
+    except (Exception, SystemExit):
+        error = traceback.format_exc()
+    finally:
+        os.chdir(old_cwd)
+    return {"output": output.getvalue(), "error": error}
+
+
+# Unix domain sockets are not available everywhere (such as on Windows),
+# there the scripts always run in their own process.
+if hasattr(socket, "AF_UNIX"):
+
+    class WorkerHandler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            line = self.rfile.readline()
+            if not line:
+                return
+            message = json.loads(line)
+
+            if message["command"] == "run":
+                response = run_script(
+                    message["script"], message["args"], message["cwd"]
+                )
+            elif message["command"] == "stop":
+                response = {"output": "", "error": None}
+                self.server.stopping = True
+            else:
+                response = {"output": "", "error": None}
+
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+    class WorkerServer(socketserver.UnixStreamServer):
+        """Handles one request at a time, everything imported or cached stays loaded between them."""
+
+        stopping = False
+
+
+def serve(socket_path: Optional[Path] = None) -> None:
+    """Runs the worker until it gets a stop request.
+    A socket left behind by a worker that is not running anymore is replaced."""
+    if not hasattr(socket, "AF_UNIX"):
+        raise OSError(
+            "The worker needs Unix domain sockets, not available on this system"
+        )
+
+    socket_path = get_socket_path() if socket_path is None else socket_path
+    if request({"command": "ping"}, socket_path=socket_path) is not None:
+        raise OSError(f"A worker is already running on {socket_path}")
+    if socket_path.exists():
+        socket_path.unlink()
+
+    old_umask = os.umask(0o077)
+    try:
+        server = WorkerServer(str(socket_path), WorkerHandler)
+    finally:
+        os.umask(old_umask)
+
+    try:
+        with server:
+            while not server.stopping:
+                server.handle_request()
+    finally:
+        if socket_path.exists():
+            socket_path.unlink()
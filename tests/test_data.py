@@ -2,6 +2,7 @@ from __future__ import annotations
 import nltk
 
 import pytest
+import spacy
 from pathlib import Path
 
 from dynamicfluency.model_data import (
@@ -9,8 +10,14 @@ from dynamicfluency.model_data import (
     NLTK_TAGGERS,
     VALID_LANGUAGES,
     assert_valid_language,
+    find_nltk_resources,
+    get_nltk_resources,
+    get_nltk_tagger,
+    get_spacy_model,
+    get_trimmed_model_path,
     load_nltk_model,
     load_spacy_model,
+    get_installed_models,
 )
 
 
@@ -38,3 +45,84 @@ class TestModelsAvailable:
             load_nltk_model(model)
             tokens = nltk.pos_tag(tokens=["blah", "blah"], lang=model)
             assert tokens
+
+    def test_nltk_tagger_loaded_once(self):
+        for model in NLTK_TAGGERS.values():
+            tagger = get_nltk_tagger(model)
+            assert tagger is get_nltk_tagger(model)
+            assert tagger.tag(["blah", "blah"]) == nltk.pos_tag(
+                tokens=["blah", "blah"], lang=model
+            )
+
+
+class TestSpacyRegistry:
+    @pytest.fixture
+    def model_path(self, tmp_path: Path) -> str:
+        nlp = spacy.blank("en")
+        nlp.add_pipe("attribute_ruler")
+        nlp.add_pipe("entity_ruler")
+        nlp.to_disk(tmp_path / "model")
+        return str(tmp_path / "model")
+
+    def test_loaded_once(self, model_path):
+        assert get_spacy_model(model_path, "pos") is get_spacy_model(model_path, "pos")
+        assert get_spacy_model(model_path, "pos") is not get_spacy_model(
+            model_path, "parse"
+        )
+
+    def test_unused_components_excluded(self, model_path):
+        assert get_spacy_model(model_path, "pos").pipe_names == ["attribute_ruler"]
+        assert load_spacy_model(model_path).pipe_names == [
+            "attribute_ruler",
+            "entity_ruler",
+        ]
+
+    def test_invalid_stage(self, model_path):
+        with pytest.raises(ValueError):
+            get_spacy_model(model_path, "lemma")
+
+    def test_no_trimmed_copy_without_package(self, model_path):
+        assert get_trimmed_model_path(model_path) is None
+
+
+class TestNltkResources:
+    @pytest.fixture(autouse=True)
+    def empty_nltk_data(self, monkeypatch, tmp_path: Path) -> Path:
+        monkeypatch.setattr(nltk.data, "path", [str(tmp_path)])
+        load_nltk_model.cache_clear()
+        yield tmp_path
+        load_nltk_model.cache_clear()
+
+    def install_fake_resources(self, directory: Path) -> None:
+        for path in get_nltk_resources("eng").values():
+            if path.endswith("/"):
+                directory.joinpath(path).mkdir(parents=True)
+            else:
+                directory.joinpath(path).parent.mkdir(parents=True)
+                directory.joinpath(path).touch()
+
+    def test_unsupported_model(self):
+        with pytest.raises(ValueError):
+            get_nltk_resources("nld")
+
+    def test_missing_resources(self):
+        assert all(path is None for path in find_nltk_resources("eng").values())
+
+    def test_offline_raises(self, monkeypatch):
+        with pytest.raises(LookupError):
+            load_nltk_model("eng", offline=True)
+        monkeypatch.setenv("DYNAMICFLUENCY_OFFLINE", "1")
+        with pytest.raises(LookupError):
+            load_nltk_model("eng")
+
+    def test_offline_installed(self, empty_nltk_data):
+        self.install_fake_resources(empty_nltk_data)
+        assert all(path for path in find_nltk_resources("eng").values())
+        load_nltk_model("eng", offline=True)
+
+    def test_installed_models(self, monkeypatch, empty_nltk_data):
+        monkeypatch.setenv("DYNAMICFLUENCY_CACHE_DIR", str(empty_nltk_data))
+        self.install_fake_resources(empty_nltk_data)
+        assert get_installed_models("nl")["model"] == SPACY_MODELS["nl"]
+        assert all(get_installed_models("en")["resources"].values())
+        assert not list(empty_nltk_data.glob("*.json"))
@@ -1,5 +1,6 @@
 from pathlib import Path
 
+import pytest
 from praatio import textgrid as tg
 from praatio.utilities.constants import Interval, Point
 
@@ -41,6 +42,18 @@ class TestSplitLabels:
         assert split_pos_label("would_VB n't_RB 've_VB", get_pos=True) == "VB RB VB"
 
 
+class TestNormalizeWordForm:
+    def test_lowercase(self):
+        assert normalize_word_form("Aal") == "aal"
+        assert normalize_word_form("AAL") == "aal"
+
+    def test_casefold(self):
+        assert normalize_word_form("Straße") == "strasse"
+
+    def test_unicode_normalisation(self):
+        assert normalize_word_form("e\u0301") == normalize_word_form("\u00e9")
+
+
 class TestPosTierConversion:
     original_tier = get_test_tier(
         Path(__file__).parent.joinpath("data", "testgrid_pos.TextGrid")
@@ -371,3 +384,171 @@ class TestSetAllTiersFromDict:
                 2 * [str(self.test_dict_other_datatypes[tier_name])]
             )
             assert entryList[2].label == "Three"
+
+
+class TestCacheDirectory:
+    def test_environment_variable(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("DYNAMICFLUENCY_CACHE_DIR", str(tmp_path))
+        assert get_cache_directory("spacy") == tmp_path / "spacy"
+
+    def test_xdg_cache_home(self, monkeypatch, tmp_path):
+        monkeypatch.delenv("DYNAMICFLUENCY_CACHE_DIR", raising=False)
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        assert get_cache_directory() == tmp_path / "dynamicfluency"
+
+
+class TestArrayTier:
+    pos_tier = get_test_tier(
+        Path(__file__).parent.joinpath("data", "testgrid_pos.TextGrid")
+    )
+
+    def test_round_trip(self):
+        tier = ArrayTier.from_tier(self.pos_tier)
+        assert len(tier) == len(self.pos_tier.entryList)
+        assert tier.labels == [entry.label for entry in self.pos_tier.entryList]
+        round_trip = tier.to_tier()
+        assert round_trip.name == self.pos_tier.name
+        assert round_trip.entryList == self.pos_tier.entryList
+        assert round_trip.minTimestamp == self.pos_tier.minTimestamp
+        assert round_trip.maxTimestamp == self.pos_tier.maxTimestamp
+
+    def test_word_and_pos_ids(self):
+        tier = ArrayTier.from_tier(
+            self.pos_tier.new(
+                entryList=[
+                    (0, 1, "is_VB n't_RB"),
+                    (1, 2, "is_VB"),
+                    (2, 3, ""),
+                    (3, 4, "uhm"),
+                ]
+            )
+        )
+        vocabulary = tier.vocabulary
+        assert vocabulary.get_labels(tier.word_ids) == ["isn't", "is", "", "uhm"]
+        assert vocabulary.get_labels(tier.pos_ids) == ["VB RB", "VB", "", ""]
+        assert tier.label_ids[2] == EMPTY_ID
+        assert tier.pos_ids[3] == EMPTY_ID
+
+    def test_shared_vocabulary(self):
+        vocabulary = Vocabulary()
+        first = ArrayTier.from_tier(self.pos_tier, vocabulary=vocabulary)
+        second = ArrayTier.from_tier(self.pos_tier, vocabulary=vocabulary)
+        assert (first.label_ids == second.label_ids).all()
+
+    def test_ignored(self):
+        tier = ArrayTier.from_tier(
+            self.pos_tier.new(
+                entryList=[(0, 1, "uhm_UH"), (1, 2, "is_VB"), (2, 3, ""), (3, 4, "a")]
+            )
+        )
+        assert tier.get_ignored(["uhm", "a"]).tolist() == [True, False, True, True]
+        assert tier.get_ignored().tolist() == [False, False, True, False]
+        # Words to ignore are not added to the vocabulary.
+        size = len(tier.vocabulary)
+        tier.get_ignored(["unknown"])
+        assert len(tier.vocabulary) == size
+
+    def test_replaced_labels(self):
+        tier = ArrayTier.from_tier(
+            self.pos_tier.new(entryList=[(0, 1, "a_DT"), (1, 2, "b_NN")])
+        )
+        new = tier.to_tier(name="New", labels=["1", None])
+        assert new.name == "New"
+        assert [entry.label for entry in new.entryList] == ["1", "b_NN"]
+
+
+class TestTextgridFiles:
+    data = Path(__file__).parent.joinpath("data")
+    files = [
+        data.joinpath("testgrid_pos.TextGrid"),
+        data.joinpath("testgrid_word_form.TextGrid"),
+        data.joinpath("testgrid_manytiers.TextGrid"),
+    ]
+
+    def test_read(self):
+        for file in self.files:
+            expected = tg.openTextgrid(str(file), includeEmptyIntervals=True)
+            grid = read_textgrid(file)
+            assert grid.tierNameList == expected.tierNameList
+            assert grid.minTimestamp == expected.minTimestamp
+            assert grid.maxTimestamp == expected.maxTimestamp
+            for name in expected.tierNameList:
+                assert (
+                    grid.tierDict[name].entryList == expected.tierDict[name].entryList
+                )
+
+    def test_read_tier(self):
+        file = self.files[2]
+        expected = tg.openTextgrid(str(file), includeEmptyIntervals=True)
+        name = expected.tierNameList[-1]
+        tier = read_textgrid_tier(file, name)
+        assert tier.name == name
+        assert tier.entryList == expected.tierDict[name].entryList
+
+        grid = read_textgrid(file, tier_names=[name])
+        assert grid.tierNameList == [name]
+
+    def test_missing_tier(self):
+        with pytest.raises(KeyError):
+            read_textgrid_tier(self.files[0], "Not a tier")
+
+    def test_write(self, tmp_path):
+        for file in self.files:
+            grid = tg.openTextgrid(str(file), includeEmptyIntervals=True)
+            for format in TEXTGRID_FORMATS:
+                expected, written = tmp_path / "expected", tmp_path / "written"
+                grid.save(str(expected), format=format, includeBlankSpaces=True)
+                write_textgrid(grid, written, format=format)
+                assert written.read_bytes() == expected.read_bytes()
+
+    def test_write_read_escaped_labels(self, tmp_path):
+        tier = get_test_tier(self.files[0]).new(
+            name='A "tier"',
+            entryList=[(0.5, 1, 'said "hi"'), (1.25, 2, "")],
+            minTimestamp=0,
+        )
+        grid = tg.Textgrid()
+        grid.addTier(tier)
+        for format in TEXTGRID_FORMATS:
+            write_textgrid(grid, tmp_path / "grid", format=format)
+            read = read_textgrid_tier(tmp_path / "grid", 'A "tier"')
+            expected = tg.openTextgrid(
+                str(tmp_path / "grid"), includeEmptyIntervals=True
+            ).tierDict['A "tier"']
+            assert read.entryList == expected.entryList
+            assert read.entryList[1].label == 'said "hi"'
+
+    def test_unknown_format(self, tmp_path):
+        with pytest.raises(ValueError):
+            write_textgrid(tg.Textgrid(), tmp_path / "grid", format="json")
+
+    def test_lazy_textgrid(self):
+        file = self.files[2]
+        expected = tg.openTextgrid(str(file), includeEmptyIntervals=True)
+        grid = LazyTextgrid(file)
+        assert grid.tier_names == expected.tierNameList
+        assert grid.min_timestamp == expected.minTimestamp
+        assert grid.max_timestamp == expected.maxTimestamp
+        assert expected.tierNameList[0] in grid
+        assert "Not a tier" not in grid
+        for name in reversed(expected.tierNameList):
+            assert grid.get_tier(name).entryList == expected.tierDict[name].entryList
+
+    def test_lazy_textgrid_item_line_in_label(self, tmp_path):
+        tier = get_test_tier(self.files[0])
+        grid = tg.Textgrid()
+        grid.addTier(tier.new(name="A", entryList=[(0, 1, "a\n    item [3]:")]))
+        grid.addTier(tier.new(name="B", entryList=[(0, 1, "b")]))
+        write_textgrid(grid, tmp_path / "grid")
+        lazy = LazyTextgrid(tmp_path / "grid")
+        assert lazy.tier_names == ["A", "B"]
+        assert lazy.get_tier("A").entryList[0].label == "a\n    item [3]:"
+
+    def test_lazy_textgrid_utf16(self, tmp_path):
+        file = self.files[2]
+        text = file.read_text(encoding="utf-8").replace("\n", "\r\n")
+        (tmp_path / "grid").write_bytes(text.encode("utf-16"))
+        expected = tg.openTextgrid(str(file), includeEmptyIntervals=True)
+        grid = LazyTextgrid(tmp_path / "grid")
+        for name in expected.tierNameList:
+            assert grid.get_tier(name).entryList == expected.tierDict[name].entryList
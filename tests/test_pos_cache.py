@@ -0,0 +1,102 @@
+import os
+from pathlib import Path
+
+import pytest
+import spacy
+
+import dynamicfluency.pos_tagging
+from dynamicfluency.pos_cache import *
+from dynamicfluency.pos_tagging import make_pos_tiers
+
+from .helpers import get_test_tier
+
+
+class TestPosTagCache:
+    def test_round_trip(self, tmp_path):
+        cache = PosTagCache(tmp_path)
+        key = cache.make_key(
+            ["a", "", "b"], lang="en", backend="nltk", model_version="1"
+        )
+        assert cache.get(key) is None
+        cache.put(key, ["a_DT", "", "b_NN"])
+        assert cache.get(key) == ["a_DT", "", "b_NN"]
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_keys(self):
+        key = PosTagCache.make_key(["a"], lang="en", backend="nltk", model_version="1")
+        assert key == PosTagCache.make_key(
+            ["a"], lang="en", backend="nltk", model_version="1"
+        )
+        assert key != PosTagCache.make_key(
+            ["a"], lang="en", backend="nltk", model_version="2"
+        )
+        assert key != PosTagCache.make_key(
+            ["a"], lang="nl", backend="spacy", model_version="1"
+        )
+        assert key != PosTagCache.make_key(
+            ["a", ""], lang="en", backend="nltk", model_version="1"
+        )
+        assert key != PosTagCache.make_key(
+            ["a"], lang="en", backend="nltk", model_version="1", pretokenized=True
+        )
+
+    def test_prune_least_recently_used(self, tmp_path):
+        cache = PosTagCache(tmp_path)
+        keys = [
+            cache.make_key([str(i)], lang="en", backend="nltk", model_version="1")
+            for i in range(3)
+        ]
+        for i, key in enumerate(keys):
+            cache.put(key, ["x" * 1000])
+            os.utime(cache._path(key), (i, i))
+        cache.get(keys[0])
+
+        cache.max_size = cache._path(keys[0]).stat().st_size * 2
+        cache.prune()
+        assert cache.get(keys[0]) is not None
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[2]) is not None
+
+
+class TestCachedPosTiers:
+    original_tier = get_test_tier(
+        Path(__file__).parent.joinpath("data", "testgrid_word_form.TextGrid")
+    )
+
+    def test_model_not_loaded_on_hit(self, monkeypatch, tmp_path):
+        nlp = spacy.blank("nl")
+        monkeypatch.setattr(
+            dynamicfluency.pos_tagging, "get_spacy_model", lambda *_: nlp
+        )
+        monkeypatch.setattr(
+            dynamicfluency.pos_tagging, "get_model_version", lambda _: "1"
+        )
+        cache = PosTagCache(tmp_path)
+
+        [tagged] = make_pos_tiers([self.original_tier], lang="nl", cache=cache)
+
+        def not_loaded(*_):
+            raise AssertionError("Model loaded on a cache hit")
+
+        monkeypatch.setattr(dynamicfluency.pos_tagging, "get_spacy_model", not_loaded)
+        [cached] = make_pos_tiers([self.original_tier], lang="nl", cache=cache)
+        assert cached.entryList == tagged.entryList
+        assert cached.name == tagged.name
+        assert cache.hits == 1
+
+    def test_pretokenized_not_shared(self, monkeypatch, tmp_path):
+        nlp = spacy.blank("nl")
+        monkeypatch.setattr(
+            dynamicfluency.pos_tagging, "get_spacy_model", lambda *_: nlp
+        )
+        monkeypatch.setattr(
+            dynamicfluency.pos_tagging, "get_model_version", lambda _: "1"
+        )
+        cache = PosTagCache(tmp_path)
+
+        make_pos_tiers([self.original_tier], lang="nl", cache=cache)
+        make_pos_tiers([self.original_tier], lang="nl", cache=cache, pretokenized=True)
+        assert (cache.hits, cache.misses) == (0, 2)
+
+        make_pos_tiers([self.original_tier], lang="nl", cache=cache, pretokenized=True)
+        assert (cache.hits, cache.misses) == (1, 2)
@@ -2,6 +2,7 @@
 # However, this least asserts that none of the files have syntax errors
 
 from dynamicfluency.scripts.add_frequency_dictionary import *
+from dynamicfluency.scripts.compile_frequency_store import *
 from dynamicfluency.scripts.convert_aeneas_to_textgrids import *
 from dynamicfluency.scripts.download_models import *
 from dynamicfluency.scripts.get_database_columns import *
@@ -9,6 +10,8 @@ from dynamicfluency.scripts.make_frequencytagged_girds_from_aligned_grids import
 from dynamicfluency.scripts.make_postagged_grids_from_aligned_grids import *
 from dynamicfluency.scripts.make_repetitionstagged_grids_from_postagged_grids import *
 from dynamicfluency.scripts.make_syntax_grids_from_postagged_grids import *
+from dynamicfluency.scripts.migrate_frequency_database import *
+from dynamicfluency.scripts.start_worker import *
 
 
 def test_true():
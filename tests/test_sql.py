@@ -4,12 +4,20 @@ import sqlite3
 from pathlib import Path
 from typing import List, Dict
 
+import numpy as np
 import pandas
+import pytest
 from praatio import textgrid as tg
 from praatio.utilities.constants import INTERVAL_TIER
 
 from dynamicfluency.word_frequencies import *
-from dynamicfluency.helpers import get_row_cursor
+from dynamicfluency.frequency_store import *
+from dynamicfluency.helpers import (
+    ArrayTier,
+    get_row_cursor,
+    open_read_only_database,
+    load_table_into_memory,
+)
 
 
 def create_mock_database_from_file(file: Path) -> sqlite3.Cursor:
@@ -266,3 +274,700 @@ class TestPartialFrequencyGrid:
             entryList = self.grid.tierDict[tier_name].entryList
             # text = "BLEEH" // not in the csv
             assert entryList[7].label == "MISSING"
+
+
+class TestBatchedLookup:
+    cursor = create_mock_database_from_file(
+        Path(__file__).parent.joinpath("data", "test_word_form.csv")
+    )
+
+    def get_grid(self, *, batched: bool):
+        return create_frequency_grid(
+            tg.openTextgrid(
+                Path(__file__).parent.joinpath("data", "testgrid_word_form.TextGrid"),
+                includeEmptyIntervals=True,
+            ).tierDict["TestTier"],
+            cursor=self.cursor,
+            table_name="Mock",
+            to_ignore=["uhm", "aardvark"],
+            batched=batched,
+        )
+
+    def test_array_tier(self):
+        tier = tg.openTextgrid(
+            Path(__file__).parent.joinpath("data", "testgrid_word_form.TextGrid"),
+            includeEmptyIntervals=True,
+        ).tierDict["TestTier"]
+        grid = create_frequency_grid(
+            ArrayTier.from_tier(tier),
+            cursor=self.cursor,
+            table_name="Mock",
+            to_ignore=["uhm", "aardvark"],
+        )
+        batched = self.get_grid(batched=True)
+        for tier_name in batched.tierDict.keys():
+            assert (
+                grid.tierDict[tier_name].entryList
+                == batched.tierDict[tier_name].entryList
+            )
+
+    def test_rows_found(self):
+        rows = get_rows_from_db(
+            cursor=self.cursor, table_name="Mock", word_forms=["a", "A", "isn", "t"]
+        )
+        assert set(rows.keys()) == {"a", "A", "isn", "t"}
+        assert rows["A"]["WordForm"] == "a"
+
+    def test_rows_missing(self):
+        rows = get_rows_from_db(
+            cursor=self.cursor, table_name="Mock", word_forms=["BLEEH", "a"]
+        )
+        assert "BLEEH" not in rows
+        assert "a" in rows
+
+    def test_rows_over_chunk_size(self):
+        word_forms = [f"not_a_word_{i}" for i in range(2 * LOOKUP_CHUNK_SIZE)]
+        rows = get_rows_from_db(
+            cursor=self.cursor, table_name="Mock", word_forms=word_forms + ["aal"]
+        )
+        assert set(rows.keys()) == {"aal"}
+
+    def test_same_as_unbatched(self):
+        batched = self.get_grid(batched=True)
+        unbatched = self.get_grid(batched=False)
+        assert batched.tierDict.keys() == unbatched.tierDict.keys()
+        for tier_name in batched.tierDict.keys():
+            assert (
+                batched.tierDict[tier_name].entryList
+                == unbatched.tierDict[tier_name].entryList
+            )
+
+
+class TestWordFormKey:
+    cursor = create_mock_database_from_file(
+        Path(__file__).parent.joinpath("data", "test_word_form.csv")
+    )
+    add_word_form_key(cursor.connection, table_name="Mock")
+    cursor.execute("INSERT INTO Mock (WordForm, FREQcount) VALUES ('AAL', '2');")
+    add_word_form_key(cursor.connection, table_name="Mock")
+
+    def test_has_key(self):
+        assert has_word_form_key(self.cursor, table_name="Mock")
+
+    def test_key_not_a_column(self):
+        assert KEY_COLUMN not in get_column_names(self.cursor, table_name="Mock")
+
+    def test_key_index_used(self):
+        self.cursor.execute(
+            f"EXPLAIN QUERY PLAN SELECT * FROM Mock WHERE {KEY_COLUMN} IN (?);",
+            ["aal"],
+        )
+        assert any("INDEX" in row["detail"] for row in self.cursor.fetchall())
+
+    def test_duplicate_keeps_first(self):
+        rows = get_rows_from_db(
+            cursor=self.cursor, table_name="Mock", word_forms=["aAl"]
+        )
+        assert rows["aAl"]["WordForm"] == "aal"
+
+    def test_no_wildcards(self):
+        rows = get_rows_from_db(
+            cursor=self.cursor, table_name="Mock", word_forms=["a_l", "aa%"]
+        )
+        assert not rows
+
+    def test_same_grid_as_without_key(self):
+        def get_grid(cursor):
+            return create_frequency_grid(
+                tg.openTextgrid(
+                    Path(__file__).parent.joinpath(
+                        "data", "testgrid_word_form.TextGrid"
+                    ),
+                    includeEmptyIntervals=True,
+                ).tierDict["TestTier"],
+                cursor=cursor,
+                table_name="Mock",
+                to_ignore=["uhm", "aardvark"],
+            )
+
+        with_key = get_grid(self.cursor)
+        without_key = get_grid(
+            create_mock_database_from_file(
+                Path(__file__).parent.joinpath("data", "test_word_form.csv")
+            )
+        )
+        assert with_key.tierDict.keys() == without_key.tierDict.keys()
+        for tier_name in with_key.tierDict.keys():
+            assert (
+                with_key.tierDict[tier_name].entryList
+                == without_key.tierDict[tier_name].entryList
+            )
+
+
+class TestFrequencyCache:
+    def get_grid(self, cursor, cache):
+        return create_frequency_grid(
+            tg.openTextgrid(
+                Path(__file__).parent.joinpath("data", "testgrid_word_form.TextGrid"),
+                includeEmptyIntervals=True,
+            ).tierDict["TestTier"],
+            cursor=cursor,
+            table_name="Mock",
+            to_ignore=["uhm", "aardvark"],
+            cache=cache,
+        )
+
+    def test_eviction(self):
+        cache = FrequencyCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+        assert len(cache) == 2
+        assert cache.get("b") is FrequencyCache.NOT_CACHED
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+    def test_counters(self):
+        cache = FrequencyCache()
+        cache.put("a", None)
+        assert cache.get("a") is None
+        assert cache.get("b") is FrequencyCache.NOT_CACHED
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_disabled(self):
+        cache = FrequencyCache(maxsize=0)
+        cache.put("a", 1)
+        assert len(cache) == 0
+
+    def test_shrink(self):
+        cache = FrequencyCache(maxsize=3)
+        for key in "abc":
+            cache.put(key, key)
+        cache.get("a")
+        cache.maxsize = 2
+        assert len(cache) == 2
+        assert cache.get("b") is FrequencyCache.NOT_CACHED
+        assert cache.get("a") == "a"
+        cache.maxsize = 0
+        assert len(cache) == 0
+        cache.maxsize = None
+        cache.put("a", 1)
+        assert len(cache) == 1
+
+    def test_missing_cached(self):
+        cursor = create_mock_database_from_file(
+            Path(__file__).parent.joinpath("data", "test_word_form.csv")
+        )
+        cache = FrequencyCache()
+        for _ in range(2):
+            rows = get_rows_from_db(
+                cursor=cursor, table_name="Mock", word_forms=["BLEEH"], cache=cache
+            )
+            assert not rows
+        assert cache.misses == 1
+        assert cache.hits == 1
+
+    def test_second_grid_from_cache(self):
+        cursor = create_mock_database_from_file(
+            Path(__file__).parent.joinpath("data", "test_word_form.csv")
+        )
+        cache = FrequencyCache()
+        uncached = self.get_grid(cursor, None)
+        first = self.get_grid(cursor, cache)
+        misses = cache.misses
+        second = self.get_grid(cursor, cache)
+        assert cache.misses == misses
+        assert cache.hits == misses
+        for tier_name in uncached.tierDict.keys():
+            assert (
+                uncached.tierDict[tier_name].entryList
+                == first.tierDict[tier_name].entryList
+                == second.tierDict[tier_name].entryList
+            )
+
+    def test_keyed_by_columns(self):
+        cursor = create_mock_database_from_file(
+            Path(__file__).parent.joinpath("data", "test_word_form.csv")
+        )
+        cache = FrequencyCache()
+        for columns in (["FREQcount"], ["CDcount"]):
+            rows = get_rows_from_db(
+                cursor=cursor,
+                table_name="Mock",
+                word_forms=["a"],
+                columns=columns,
+                cache=cache,
+            )
+            assert list(rows["a"].keys()) == columns
+
+    def test_keyed_by_database(self):
+        cache = FrequencyCache()
+        for count in ("1", "2", "3"):
+            # Every new connection may get the id() of the one before it.
+            connection = sqlite3.connect(":memory:")
+            connection.execute("CREATE TABLE Mock (WordForm TEXT, FREQcount TEXT);")
+            connection.execute("INSERT INTO Mock VALUES ('a', ?);", [count])
+            rows = get_rows_from_db(
+                cursor=get_row_cursor(connection),
+                table_name="Mock",
+                word_forms=["a"],
+                cache=cache,
+            )
+            assert rows["a"]["FREQcount"] == count
+            connection.close()
+
+    def test_keyed_by_file_version(self, tmp_path):
+        file = str(tmp_path / "main.db")
+        cache = FrequencyCache()
+        for count in ("1", "22"):
+            with sqlite3.connect(file) as database:
+                database.execute(
+                    "CREATE TABLE IF NOT EXISTS Mock (WordForm TEXT, FREQcount TEXT);"
+                )
+                database.execute("DELETE FROM Mock;")
+                database.execute("INSERT INTO Mock VALUES ('a', ?);", [count])
+            database.close()
+            lookup = SQLiteFrequencyLookup.open(file, table_name="Mock", cache=cache)
+            assert lookup.get_rows(["a"])["a"]["FREQcount"] == count
+            lookup.close()
+
+    def test_in_memory_named_after_file(self, tmp_path):
+        file = tmp_path / "main.db"
+        with sqlite3.connect(file) as database:
+            database.execute("CREATE TABLE Mock (WordForm TEXT);")
+        connection = load_table_into_memory(str(file), table_name="Mock")
+        assert get_database_name(connection.cursor()) == str(file.resolve())
+        connection.close()
+
+    def test_table_info_looked_up_once(self):
+        cursor = create_mock_database_from_file(
+            Path(__file__).parent.joinpath("data", "test_word_form.csv")
+        )
+        lookup = SQLiteFrequencyLookup(cursor, table_name="Mock")
+        lookup.get_rows(["a"])
+        statements = []
+        cursor.connection.set_trace_callback(statements.append)
+        for word_form in ("aal", "isn", "t"):
+            assert word_form in lookup.get_rows([word_form])
+        lookup.get_column_names()
+        assert len(statements) == 3
+        assert not any("PRAGMA" in sql or "sqlite_" in sql for sql in statements)
+
+
+class TestFrequencyStore:
+    csv_file = Path(__file__).parent.joinpath("data", "test_word_form.csv")
+
+    def get_grid(self, **kwargs):
+        return create_frequency_grid(
+            tg.openTextgrid(
+                Path(__file__).parent.joinpath("data", "testgrid_word_form.TextGrid"),
+                includeEmptyIntervals=True,
+            ).tierDict["TestTier"],
+            to_ignore=["uhm", "aardvark"],
+            **kwargs,
+        )
+
+    def assert_same_grids(self, first, second):
+        assert first.tierDict.keys() == second.tierDict.keys()
+        for tier_name in first.tierDict.keys():
+            assert (
+                first.tierDict[tier_name].entryList
+                == second.tierDict[tier_name].entryList
+            )
+
+    def test_from_db(self, tmp_path):
+        cursor = create_mock_database_from_file(self.csv_file)
+        compile_frequency_store_from_db(
+            cursor, table_name="Mock", file=tmp_path / "mock.store"
+        )
+        store = FrequencyStore(tmp_path / "mock.store")
+        assert store.get_column_names() == get_column_names(cursor, table_name="Mock")
+        self.assert_same_grids(
+            self.get_grid(lookup=store),
+            self.get_grid(cursor=cursor, table_name="Mock"),
+        )
+
+    def test_from_csv(self, tmp_path):
+        cursor = create_mock_database_from_file(self.csv_file)
+        compile_frequency_store_from_csv(self.csv_file, out=tmp_path / "mock.store")
+        self.assert_same_grids(
+            self.get_grid(lookup=FrequencyStore(tmp_path / "mock.store")),
+            self.get_grid(cursor=cursor, table_name="Mock"),
+        )
+
+    def test_partial_columns(self, tmp_path):
+        compile_frequency_store_from_csv(self.csv_file, out=tmp_path / "mock.store")
+        store = FrequencyStore(tmp_path / "mock.store")
+        rows = store.get_rows(["AAL", "BLEEH"], columns=["FREQcount"])
+        assert rows == {"AAL": {"FREQcount": "1"}}
+
+    def test_numeric_columns(self, tmp_path):
+        compile_frequency_store_from_csv(self.csv_file, out=tmp_path / "mock.store")
+        store = FrequencyStore(tmp_path / "mock.store")
+        assert store.types["FREQcount"] == ("INTEGER", None)
+        assert store.types["Lg10WF"] == ("REAL", 4)
+        assert store.types["WordForm"] == ("TEXT", None)
+        assert store._arrays["values/FREQcount"].dtype == np.int64
+        assert store._arrays["values/Lg10WF"].dtype == np.float64
+        rows = store.get_rows(["aal"], columns=["Lg10WF", "FREQcount"])
+        assert rows == {"aal": {"Lg10WF": "0.3010", "FREQcount": "1"}}
+
+    def test_text_columns(self, tmp_path):
+        rows = [
+            {"WordForm": "a", "Text": "x" * 1000},
+            {"WordForm": "b", "Text": None},
+            {"WordForm": "é", "Text": "één"},
+            {"WordForm": "c", "Text": "0.3"},
+        ]
+        write_frequency_store(rows, columns=["Text"], file=tmp_path / "text.store")
+        store = FrequencyStore(tmp_path / "text.store")
+        assert store.types["Text"] == ("TEXT", None)
+        assert store._arrays["values/Text"].nbytes == 1000 + len("één".encode()) + 3
+        assert store.get_rows(["A", "b", "é", "c", "d"]) == {
+            "A": {"Text": "x" * 1000},
+            "b": {"Text": None},
+            "é": {"Text": "één"},
+            "c": {"Text": "0.3"},
+        }
+
+    def test_from_numeric_db(self, tmp_path, monkeypatch):
+        import dynamicfluency.frequency_store
+        from dynamicfluency.scripts.add_frequency_dictionary import (
+            import_file_in_chunks,
+        )
+
+        monkeypatch.setattr(dynamicfluency.frequency_store, "FETCH_SIZE", 2)
+        database = sqlite3.connect(":memory:")
+        import_file_in_chunks(
+            str(self.csv_file),
+            database=database,
+            table_name="Mock",
+            sep=",",
+            numeric=True,
+        )
+        compile_frequency_store_from_db(
+            database.cursor(), table_name="Mock", file=tmp_path / "mock.store"
+        )
+        self.assert_same_grids(
+            self.get_grid(lookup=FrequencyStore(tmp_path / "mock.store")),
+            self.get_grid(
+                cursor=create_mock_database_from_file(self.csv_file), table_name="Mock"
+            ),
+        )
+
+    def test_empty_store(self, tmp_path):
+        write_frequency_store([], columns=["WordForm"], file=tmp_path / "empty.store")
+        assert FrequencyStore(tmp_path / "empty.store").get_rows(["a"]) == {}
+
+    def test_not_a_store(self, tmp_path):
+        (tmp_path / "not.store").write_bytes(b"not a store")
+        with pytest.raises(ValueError):
+            FrequencyStore(tmp_path / "not.store")
+
+
+class TestReadOnlyDatabase:
+    csv_file = Path(__file__).parent.joinpath("data", "test_word_form.csv")
+
+    def make_database(self, tmp_path) -> str:
+        file = str(tmp_path / "main.db")
+        with sqlite3.connect(file) as database:
+            pandas.read_csv(self.csv_file, index_col="WordForm", dtype=str).to_sql(
+                "Mock", database
+            )
+            add_word_form_key(database, table_name="Mock")
+        return file
+
+    def get_grid(self, lookup):
+        return create_frequency_grid(
+            tg.openTextgrid(
+                Path(__file__).parent.joinpath("data", "testgrid_word_form.TextGrid"),
+                includeEmptyIntervals=True,
+            ).tierDict["TestTier"],
+            lookup=lookup,
+            to_ignore=["uhm", "aardvark"],
+        )
+
+    def test_cannot_write(self, tmp_path):
+        connection = open_read_only_database(self.make_database(tmp_path))
+        with pytest.raises(sqlite3.OperationalError):
+            connection.execute("DELETE FROM Mock;")
+        connection.close()
+
+    def test_in_memory_copy(self, tmp_path):
+        connection = load_table_into_memory(
+            self.make_database(tmp_path), table_name="Mock"
+        )
+        cursor = get_row_cursor(connection)
+        assert has_word_form_key(cursor, table_name="Mock")
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'Mock';"
+        )
+        assert f"ix_Mock_{KEY_COLUMN}" in [row["name"] for row in cursor.fetchall()]
+        with pytest.raises(sqlite3.OperationalError):
+            connection.execute("DELETE FROM Mock;")
+        connection.close()
+
+    def test_same_grids(self, tmp_path):
+        file = self.make_database(tmp_path)
+        on_disk = SQLiteFrequencyLookup.open(file, table_name="Mock")
+        in_memory = SQLiteFrequencyLookup.open(file, table_name="Mock", in_memory=True)
+        first, second = self.get_grid(on_disk), self.get_grid(in_memory)
+        on_disk.close()
+        in_memory.close()
+        for tier_name in first.tierDict.keys():
+            assert (
+                first.tierDict[tier_name].entryList
+                == second.tierDict[tier_name].entryList
+            )
+
+
+class TestLabelsFromRows:
+    rows = {
+        "isn": {"First": "1", "Second": None},
+        "t": {"First": "2", "Second": "3"},
+    }
+
+    def test_single(self):
+        labels = get_labels_from_rows(
+            rows=self.rows, word_form="t", columns=["First", "Second"]
+        )
+        assert labels == ["2", "3"]
+
+    def test_contraction(self):
+        labels = get_labels_from_rows(
+            rows=self.rows, word_form="isn't", columns=["First", "Second"]
+        )
+        assert labels == ["1 2", "3"]
+
+    def test_missing(self):
+        labels = get_labels_from_rows(
+            rows=self.rows, word_form="isn't've", columns=["First", "Second"]
+        )
+        assert labels == ["MISSING", "MISSING"]
+
+    def test_same_as_set_labels(self):
+        grid = tg.openTextgrid(
+            Path(__file__).parent.joinpath("data", "testgrid_manytiers.TextGrid"),
+            includeEmptyIntervals=True,
+        )
+        columns = list(grid.tierDict.keys())
+        rows = {
+            "a": {"First": "1", "Second": None, "Third": 3},
+            "b": {"First": "4", "Second": "5", "Third": 6.0},
+        }
+        set_labels_from_rows(grid=grid, rows=rows, word_form="a'b", index=0)
+        labels = get_labels_from_rows(rows=rows, word_form="a'b", columns=columns)
+        assert labels == [grid.tierDict[name].entryList[0].label for name in columns]
+
+
+class TestNumericColumns:
+    csv_file = Path(__file__).parent.joinpath("data", "test_word_form.csv")
+
+    def test_infer_integer(self):
+        assert infer_column_type(["1", "20", None]) == ("INTEGER", None)
+
+    def test_infer_real(self):
+        assert infer_column_type(["0.30", "5.00", "-1.25"]) == ("REAL", 2)
+
+    def test_infer_text(self):
+        assert infer_column_type(["0.3", "5.00"]) == ("TEXT", None)
+        assert infer_column_type(["01", "2"]) == ("TEXT", None)
+        assert infer_column_type(["1", "a"]) == ("TEXT", None)
+        assert infer_column_type(["1.", "2."]) == ("TEXT", None)
+        assert infer_column_type([None]) == ("TEXT", None)
+        assert infer_column_type([str(2**63 - 1), str(-(2**63))]) == ("INTEGER", None)
+        assert infer_column_type(["1", str(2**63)]) == ("TEXT", None)
+
+    def test_out_of_range_integers(self, tmp_path):
+        from dynamicfluency.scripts.add_frequency_dictionary import (
+            convert_numeric_columns,
+            import_file_in_chunks,
+        )
+
+        file = tmp_path / "large.csv"
+        file.write_text("WordForm,Count\na,1\nb,99999999999999999999\n")
+
+        whole = sqlite3.connect(":memory:")
+        df = pandas.read_csv(file, index_col="WordForm", dtype=str)
+        df, types, decimals = convert_numeric_columns(df)
+        df.to_sql("Mock", whole, dtype=types)
+
+        chunked = sqlite3.connect(":memory:")
+        import_file_in_chunks(
+            str(file), database=chunked, table_name="Mock", sep=",", numeric=True
+        )
+
+        for database in [whole, chunked]:
+            cursor = get_row_cursor(database)
+            rows = get_rows_from_db(
+                cursor=cursor, table_name="Mock", word_forms=["a", "b"]
+            )
+            assert rows["b"]["Count"] == "99999999999999999999"
+            cursor.execute("SELECT typeof(Count) AS type FROM Mock LIMIT 1;")
+            assert cursor.fetchone()["type"] == "text"
+
+    def test_format_value(self):
+        assert format_value(0.301, 4) == "0.3010"
+        assert format_value(12, None) == "12"
+        assert format_value("text", 2) == "text"
+        assert format_value(None, 2) is None
+
+    def test_same_grid_as_text(self):
+        from dynamicfluency.scripts.add_frequency_dictionary import (
+            convert_numeric_columns,
+        )
+
+        df = pandas.read_csv(self.csv_file, index_col="WordForm", dtype=str)
+        df, types, decimals = convert_numeric_columns(df)
+        assert types["FREQcount"] == "INTEGER"
+        assert decimals["Lg10WF"] == 4
+
+        database = sqlite3.connect(":memory:")
+        df.to_sql("Mock", database, dtype=types)
+        set_column_formats(database, table_name="Mock", decimals=decimals)
+        cursor = get_row_cursor(database)
+        assert get_column_formats(cursor, table_name="Mock") == decimals
+
+        def get_grid(cursor):
+            return create_frequency_grid(
+                tg.openTextgrid(
+                    Path(__file__).parent.joinpath(
+                        "data", "testgrid_word_form.TextGrid"
+                    ),
+                    includeEmptyIntervals=True,
+                ).tierDict["TestTier"],
+                cursor=cursor,
+                table_name="Mock",
+                to_ignore=["uhm", "aardvark"],
+            )
+
+        numeric = get_grid(cursor)
+        text = get_grid(create_mock_database_from_file(self.csv_file))
+        for tier_name in text.tierDict.keys():
+            assert (
+                numeric.tierDict[tier_name].entryList
+                == text.tierDict[tier_name].entryList
+            )
+
+    def test_same_grid_in_memory(self, tmp_path):
+        from dynamicfluency.scripts.add_frequency_dictionary import (
+            convert_numeric_columns,
+        )
+
+        file = str(tmp_path / "numeric.db")
+        df = pandas.read_csv(self.csv_file, index_col="WordForm", dtype=str)
+        df, types, decimals = convert_numeric_columns(df)
+        with sqlite3.connect(file) as database:
+            df.to_sql("Mock", database, dtype=types)
+            set_column_formats(database, table_name="Mock", decimals=decimals)
+            add_word_form_key(database, table_name="Mock")
+        database.close()
+
+        def get_grid(lookup):
+            grid = create_frequency_grid(
+                tg.openTextgrid(
+                    Path(__file__).parent.joinpath(
+                        "data", "testgrid_word_form.TextGrid"
+                    ),
+                    includeEmptyIntervals=True,
+                ).tierDict["TestTier"],
+                lookup=lookup,
+                to_ignore=["uhm", "aardvark"],
+            )
+            lookup.close()
+            return grid
+
+        on_disk = get_grid(SQLiteFrequencyLookup.open(file, table_name="Mock"))
+        in_memory = get_grid(
+            SQLiteFrequencyLookup.open(file, table_name="Mock", in_memory=True)
+        )
+        text = get_grid(
+            SQLiteFrequencyLookup(
+                create_mock_database_from_file(self.csv_file), table_name="Mock"
+            )
+        )
+        for tier_name in text.tierDict.keys():
+            assert (
+                on_disk.tierDict[tier_name].entryList
+                == text.tierDict[tier_name].entryList
+            )
+            assert (
+                in_memory.tierDict[tier_name].entryList
+                == text.tierDict[tier_name].entryList
+            )
+
+
+class TestChunkedImport:
+    csv_file = Path(__file__).parent.joinpath("data", "test_word_form.csv")
+
+    def import_file(self, database, **kwargs):
+        from dynamicfluency.scripts.add_frequency_dictionary import (
+            import_file_in_chunks,
+        )
+
+        import_file_in_chunks(
+            str(self.csv_file), database=database, table_name="Mock", sep=",", **kwargs
+        )
+
+    def test_same_table_as_to_sql(self):
+        chunked = sqlite3.connect(":memory:")
+        progress = []
+        self.import_file(chunked, chunk_size=2, progress=progress.append)
+        assert progress == [2, 4, 5]
+
+        whole = create_mock_database_from_file(self.csv_file).connection
+        add_word_form_key(whole, table_name="Mock")
+
+        query = "SELECT * FROM Mock ORDER BY rowid;"
+        assert [tuple(row) for row in whole.execute(query)] == [
+            tuple(row) for row in chunked.execute(query)
+        ]
+        assert has_word_form_key(chunked.cursor(), table_name="Mock")
+
+    def test_numeric(self):
+        database = sqlite3.connect(":memory:")
+        self.import_file(database, chunk_size=2, numeric=True)
+        cursor = get_row_cursor(database)
+        assert get_column_formats(cursor, table_name="Mock")["Lg10WF"] == 4
+        rows = get_rows_from_db(cursor=cursor, table_name="Mock", word_forms=["aal"])
+        assert rows["aal"]["Lg10WF"] == "0.3010"
+        assert rows["aal"]["FREQcount"] == "1"
+        cursor.execute("SELECT typeof(FREQcount) AS type FROM Mock LIMIT 1;")
+        assert cursor.fetchone()["type"] == "integer"
+
+    def test_if_exists(self):
+        database = sqlite3.connect(":memory:")
+        self.import_file(database)
+        with pytest.raises(ValueError):
+            self.import_file(database, if_exists="fail")
+        self.import_file(database, if_exists="replace")
+        assert database.execute("SELECT COUNT(*) FROM Mock;").fetchone()[0] == 5
+
+    def test_if_exists_checked_first(self, monkeypatch):
+        import dynamicfluency.scripts.add_frequency_dictionary as script
+
+        database = sqlite3.connect(":memory:")
+        self.import_file(database)
+
+        def not_read(*_, **__):
+            raise AssertionError("File read while the table already exists")
+
+        monkeypatch.setattr(script, "read_file_in_chunks", not_read)
+        with pytest.raises(ValueError):
+            self.import_file(database, if_exists="fail", numeric=True)
+
+    def test_no_rows(self, tmp_path):
+        from dynamicfluency.scripts.add_frequency_dictionary import (
+            import_file_in_chunks,
+        )
+
+        database = sqlite3.connect(":memory:")
+        for content in ["WordForm,FREQcount\n", ""]:
+            file = tmp_path / "no_rows.csv"
+            file.write_text(content)
+            with pytest.raises(ValueError):
+                import_file_in_chunks(
+                    str(file), database=database, table_name="Mock", sep=","
+                )
@@ -1,14 +1,45 @@
 from pathlib import Path
 
+import pytest
+import spacy
+from spacy.language import Language
+
+from praatio.data_classes.interval_tier import IntervalTier
 from praatio.utilities.constants import (
     INTERVAL_TIER,
     POINT_TIER,
+    Interval,
+    Point,
 )
 
-from dynamicfluency.repetitions import make_freqdist_tier, make_repetitions_tier
-from dynamicfluency.pos_tagging import make_pos_tier
-from dynamicfluency.syntactic_analysis import make_syntax_grid
-from dynamicfluency.helpers import pos_tier_to_word_form_tier, split_pos_label
+from dynamicfluency.repetitions import (
+    make_freqdist_tier,
+    make_ngram_repetitions_tier,
+    make_repetitions_and_freqdist_tiers,
+    make_repetitions_tier,
+    make_timed_freqdist_tier,
+    make_timed_repetitions_tier,
+)
+import dynamicfluency.pos_tagging
+from dynamicfluency.pos_tagging import (
+    align_tags,
+    get_token_entries,
+    make_pos_tier,
+    make_pos_tiers,
+    make_pos_tiers_and_syntax_grids,
+)
+from dynamicfluency.syntactic_analysis import (
+    create_clause_point_tier,
+    create_phrase_point_tier,
+    make_dependency_syntax_grid,
+    make_syntax_grid,
+    parse_pos_label,
+)
+from dynamicfluency.helpers import (
+    ArrayTier,
+    pos_tier_to_word_form_tier,
+    split_pos_label,
+)
 from dynamicfluency.model_data import get_valid_tags
 
 from .helpers import get_test_tier
@@ -75,6 +106,15 @@ class TestRepetitionsTier:
         # text = "a_DT" // 4 in between, meaning that the cashe doesn't hold both.
         assert self.tier.entryList[10].label == "0"
 
+    def test_unbounded(self):
+        tier = make_repetitions_tier(
+            pos_tier=self.original_tier, max_cache=None, to_ignore=["uhm"]
+        )
+        # text = "a_DT" // 4 in between, without a maximum.
+        assert tier.entryList[10].label == "0.2"
+        for bounded, unbounded in zip(self.tier.entryList, tier.entryList):
+            assert bounded.label == unbounded.label or bounded.label == "0"
+
 
 class TestFreqdistTier:
     original_tier = get_test_tier(
@@ -161,6 +201,371 @@ class TestPosTier:
                 assert tag in possible_tags or entry.label == ""
 
 
+class TestRepetitionsAndFreqdistTiers:
+    original_tier = get_test_tier(
+        Path(__file__).parent.joinpath("data", "testgrid_pos.TextGrid")
+    )
+
+    def test_same_as_separate(self):
+        repetitions, freqdist = make_repetitions_and_freqdist_tiers(
+            self.original_tier, max_cache=5, to_ignore=["uhm"]
+        )
+        assert repetitions.name == "Repetitions"
+        assert freqdist.name == "FreqDist"
+        assert (
+            repetitions.entryList
+            == make_repetitions_tier(
+                self.original_tier, max_cache=5, to_ignore=["uhm"]
+            ).entryList
+        )
+        assert (
+            freqdist.entryList
+            == make_freqdist_tier(self.original_tier, to_ignore=["uhm"]).entryList
+        )
+
+    def test_array_tier(self):
+        tier = ArrayTier.from_tier(self.original_tier)
+        for array_tier, praatio_tier in zip(
+            make_repetitions_and_freqdist_tiers(tier, max_cache=5, to_ignore=["uhm"]),
+            make_repetitions_and_freqdist_tiers(
+                self.original_tier, max_cache=5, to_ignore=["uhm"]
+            ),
+        ):
+            assert array_tier.entryList == praatio_tier.entryList
+
+    def test_split_labels_counted_per_part(self):
+        tier = self.original_tier.new(
+            entryList=[(0, 1, "is_VB n't_RB"), (1, 2, "is_VB"), (2, 3, "")]
+        )
+        freqdist = make_freqdist_tier(tier)
+        # 3 parts in total, "is_VB" twice, the full "is_VB n't_RB" never.
+        assert [entry.label for entry in freqdist.entryList] == [
+            "0.0",
+            str(2 / 3),
+            "",
+        ]
+
+
+class TestNgramRepetitionsTier:
+    original_tier = get_test_tier(
+        Path(__file__).parent.joinpath("data", "testgrid_pos.TextGrid")
+    )
+
+    def make_tier(self, labels, **kwargs):
+        tier = self.original_tier.new(
+            entryList=[(i, i + 1, label) for i, label in enumerate(labels)]
+        )
+        return make_ngram_repetitions_tier(tier, **kwargs)
+
+    def labels(self, labels, **kwargs):
+        return [entry.label for entry in self.make_tier(labels, **kwargs).entryList]
+
+    def test_tier(self):
+        tier = make_ngram_repetitions_tier(self.original_tier, to_ignore=["uhm"])
+        assert tier.name == "NgramRepetitions"
+        assert len(tier.entryList) == len(self.original_tier.entryList)
+
+    def test_repeated_phrase(self):
+        labels = ["i_PRP", "think_VB", "i_PRP", "think_VB", "so_RB"]
+        assert self.labels(labels) == ["0", "0", "2", "2", "0"]
+
+    def test_single_words_not_phrases(self):
+        labels = ["i_PRP", "think_VB", "so_RB", "i_PRP"]
+        assert self.labels(labels) == ["0", "0", "0", "0"]
+
+    def test_longest_phrase(self):
+        labels = ["a_DT", "b_NN", "c_VB", "a_DT", "b_NN", "c_VB"]
+        assert self.labels(labels, max_n=3) == ["0", "0", "0", "3", "3", "3"]
+        assert self.labels(labels, max_n=2) == ["0", "0", "0", "2", "2", "2"]
+
+    def test_ignored_skipped_over(self):
+        labels = ["i_PRP", "think_VB", "uhm_IN", "", "i_PRP", "uhm_IN", "think_VB"]
+        assert self.labels(labels, to_ignore=["uhm"]) == [
+            "0",
+            "0",
+            "uhm_IN",
+            "",
+            "2",
+            "uhm_IN",
+            "2",
+        ]
+
+    def test_overlap_not_repeated(self):
+        labels = ["a_DT", "a_DT", "a_DT"]
+        assert self.labels(labels) == ["0", "0", "0"]
+
+    def test_max_cache_respected(self):
+        labels = ["a_DT", "b_NN", "x_NN", "x_NN", "x_NN", "a_DT", "b_NN"]
+        assert self.labels(labels, max_cache=5)[-2:] == ["0", "0"]
+        assert self.labels(labels, max_cache=6)[-2:] == ["2", "2"]
+        assert self.labels(labels, max_cache=None)[-2:] == ["2", "2"]
+
+
+class TestTimedTiers:
+    original_tier = get_test_tier(
+        Path(__file__).parent.joinpath("data", "testgrid_pos.TextGrid")
+    )
+    tier = original_tier.new(
+        entryList=[
+            (0, 1, "a_DT"),
+            (1, 2, "b_NN"),
+            (2, 3, "uhm_IN"),
+            (3, 4, ""),
+            (4, 5, "a_DT"),
+            (5, 6, "a_DT"),
+        ]
+    )
+
+    def test_timed_repetitions(self):
+        tier = make_timed_repetitions_tier(self.tier, window=3, to_ignore=["uhm"])
+        assert tier.name == "TimedRepetitions"
+        # a_DT at 4 is 4 seconds after the previous, a_DT at 5 only 1.
+        assert [entry.label for entry in tier.entryList] == [
+            "0",
+            "0",
+            "uhm_IN",
+            "",
+            "0",
+            "1.0",
+        ]
+
+    def test_timed_repetitions_large_window(self):
+        tier = make_timed_repetitions_tier(self.tier, window=100, to_ignore=["uhm"])
+        untimed = make_repetitions_tier(self.tier, to_ignore=["uhm"])
+        assert tier.entryList == untimed.entryList
+
+    def test_timed_freqdist(self):
+        tier = make_timed_freqdist_tier(self.tier, window=3, to_ignore=["uhm"])
+        assert tier.name == "TimedFreqDist"
+        # The window of a_DT at 4 holds b_NN, a_DT, and a_DT at 5 holds a_DT, a_DT.
+        assert [entry.label for entry in tier.entryList] == [
+            "1.0",
+            "0.5",
+            "uhm_IN",
+            "",
+            "0.5",
+            "1.0",
+        ]
+
+    def test_timed_freqdist_parts(self):
+        # The parts of the labels are counted, but a label is only counted as a whole.
+        tier = self.original_tier.new(
+            entryList=[
+                (0, 1, "a_DT"),
+                (1, 1.5, "a_DT b_NN"),
+                (1.5, 2, "a_DT"),
+                (1.5, 4, "b_NN"),
+                (4.5, 5, "a_DT"),
+            ]
+        )
+        tier = make_timed_freqdist_tier(tier, window=1)
+        # The windows of the words at 1.5 start at 0.5, the one of a_DT at 4.5 only holds itself.
+        assert [entry.label for entry in tier.entryList] == [
+            "1.0",
+            "0.0",
+            str(2 / 3),
+            "0.5",
+            "1.0",
+        ]
+
+
+class TestAlignTags:
+    entryList = [
+        Interval(0, 1, "is"),
+        Interval(1, 2, ""),
+        Interval(2, 3, "isn't"),
+        Interval(3, 4, "it"),
+    ]
+    tags = [("is", "VB"), ("is", "VB"), ("n't", "RB"), ("it", "PRP")]
+    expected = ["is_VB", "", "is_VB n't_RB", "it_PRP"]
+
+    def test_on_text(self):
+        aligned = align_tags(self.tags, self.entryList)
+        assert [entry.label for entry in aligned] == self.expected
+        assert [entry.start for entry in aligned] == [0, 1, 2, 3]
+
+    def test_on_offsets(self):
+        aligned = align_tags(self.tags, self.entryList, offsets=[0, 3, 5, 9])
+        assert [entry.label for entry in aligned] == self.expected
+
+    def test_changed_text_on_offsets(self):
+        tags = [("``", "``"), ("it", "PRP")]
+        entryList = [Interval(0, 1, '"'), Interval(1, 2, "it")]
+        aligned = align_tags(tags, entryList, offsets=[0, 2])
+        assert [entry.label for entry in aligned] == ["``_``", "it_PRP"]
+
+    def test_tags_not_changed(self):
+        tags = list(self.tags)
+        align_tags(tags, self.entryList)
+        assert tags == self.tags
+
+    def test_changed_text_raises(self):
+        tags = [("``", "``"), ("it", "PRP")]
+        entryList = [Interval(0, 1, '"'), Interval(1, 2, "it")]
+        with pytest.raises(ValueError):
+            align_tags(tags, entryList)
+
+    def test_missing_tags_raises(self):
+        with pytest.raises(ValueError):
+            align_tags(self.tags[:2], self.entryList)
+
+
+class TestBatchedNltkPosTiers:
+    original_tier = get_test_tier(
+        Path(__file__).parent.joinpath("data", "testgrid_word_form.TextGrid")
+    )
+    tiers = make_pos_tiers([original_tier, original_tier], lang="en")
+
+    def test_same_as_single(self):
+        single = make_pos_tier(self.original_tier, lang="en")
+        for tier in self.tiers:
+            assert tier.entryList == single.entryList
+
+
+class TestTaggingBackend:
+    original_tier = get_test_tier(
+        Path(__file__).parent.joinpath("data", "testgrid_word_form.TextGrid")
+    )
+
+    def test_nltk_preferred(self, monkeypatch):
+        # English has both, and is tagged with NLTK.
+        class Tagger:
+            def tag_sents(self, sentences):
+                return [[(word, "NN") for word in sentence] for sentence in sentences]
+
+        def no_spacy(*_):
+            raise AssertionError("Tagged with spaCy")
+
+        monkeypatch.setattr(dynamicfluency.pos_tagging, "get_spacy_model", no_spacy)
+        monkeypatch.setattr(
+            dynamicfluency.pos_tagging, "get_nltk_tagger", lambda _: Tagger()
+        )
+        monkeypatch.setattr(dynamicfluency.pos_tagging.nltk, "word_tokenize", str.split)
+        [tier] = dynamicfluency.pos_tagging.make_pos_tiers(
+            [self.original_tier], lang="en"
+        )
+        assert tier.entryList[0].label == "a_NN"
+
+
+class TestBatchedPosTiers:
+    original_tier = get_test_tier(
+        Path(__file__).parent.joinpath("data", "testgrid_word_form.TextGrid")
+    )
+
+    @pytest.fixture(autouse=True)
+    def blank_model(self, monkeypatch):
+        # An untrained pipeline, only the tokenisation and batching is tested here.
+        nlp = spacy.blank("nl")
+        monkeypatch.setattr(
+            dynamicfluency.pos_tagging, "get_spacy_model", lambda *_: nlp
+        )
+
+    def test_same_as_single(self):
+        single = make_pos_tier(self.original_tier, lang="nl")
+        tiers = make_pos_tiers(
+            [self.original_tier, self.original_tier], lang="nl", batch_size=1
+        )
+        assert len(tiers) == 2
+        for tier in tiers:
+            assert tier.entryList == single.entryList
+            assert tier.name == single.name
+
+    def test_empty(self):
+        assert make_pos_tiers([], lang="nl") == []
+
+    def test_pretokenized(self):
+        tier = IntervalTier(
+            "TestTier",
+            [(0, 1, "(hallo)"), (1, 2, ""), (2, 3, "daar"), (3, 4, "u.s.")],
+            0,
+            4,
+        )
+        for words_tier in (self.original_tier, tier):
+            [pretokenized] = make_pos_tiers([words_tier], lang="nl", pretokenized=True)
+            [tokenized] = make_pos_tiers([words_tier], lang="nl")
+            assert pretokenized.entryList == tokenized.entryList
+        assert pretokenized.entryList[0].label == "(_ hallo_ )_"
+
+
+@Language.component("test_dependencies")
+def set_test_dependencies(doc):
+    # The first token heads the only clause, and every "aardvark" is a verb.
+    for token in doc:
+        token.dep_ = "ROOT" if token.i == 0 else "dep"
+        token.pos_ = "VERB" if token.text == "aardvark" else "NOUN"
+    return doc
+
+
+class TestDependencySyntaxGrid:
+    original_tier = get_test_tier(
+        Path(__file__).parent.joinpath("data", "testgrid_word_form.TextGrid")
+    )
+
+    def test_points(self):
+        tier = self.original_tier.new(
+            entryList=[(0, 1, "is_AUX"), (1, 2, ""), (2, 4, "going_VERB n't_PART")]
+        )
+        grid = make_dependency_syntax_grid(
+            tier,
+            token_entries=[0, 2, 2],
+            dependencies=[("aux", "AUX"), ("ROOT", "VERB"), ("acl:relcl", "PART")],
+        )
+        assert grid.tierDict["Syntactic Clauses"].entryList == [Point(3.0, "")]
+        assert grid.tierDict["Syntactic Phrases"].entryList == [Point(3.0, "")]
+        assert grid.tierDict["Syntactic Clauses"].maxTimestamp == tier.maxTimestamp
+
+    def test_points_english_labels(self):
+        tier = self.original_tier.new(
+            entryList=[
+                (0, 1, "it_PRON"),
+                (1, 2, "was_AUX"),
+                (2, 4, "eaten_VERB"),
+                (4, 5, "being_AUX"),
+            ]
+        )
+        grid = make_dependency_syntax_grid(
+            tier,
+            token_entries=[0, 1, 2, 3],
+            dependencies=[
+                ("nsubjpass", "PRON"),
+                ("auxpass", "AUX"),
+                ("ROOT", "VERB"),
+                ("auxpass", "AUX"),
+            ],
+        )
+        assert grid.tierDict["Syntactic Clauses"].entryList == [Point(3.0, "")]
+        assert grid.tierDict["Syntactic Phrases"].entryList == [Point(3.0, "")]
+
+    def test_token_entries(self):
+        entryList = [Interval(0, 1, "isn't"), Interval(1, 2, ""), Interval(2, 3, "it")]
+        assert get_token_entries(entryList, [0, 2, 6]) == [0, 0, 2]
+
+    def test_same_pass(self, monkeypatch):
+        nlp = spacy.blank("nl")
+        nlp.add_pipe("test_dependencies")
+        monkeypatch.setattr(
+            dynamicfluency.pos_tagging, "get_spacy_model", lambda *_: nlp
+        )
+        [pos_tier], [grid] = make_pos_tiers_and_syntax_grids(
+            [self.original_tier], lang="nl"
+        )
+
+        assert [entry.label for entry in pos_tier.entryList] == [
+            (
+                entry.label.lower()
+                + ("_VERB" if entry.label.lower() == "aardvark" else "_NOUN")
+                if entry.label
+                else ""
+            )
+            for entry in self.original_tier.entryList
+        ]
+        first = next(entry for entry in pos_tier.entryList if entry.label)
+        assert [
+            point.time for point in grid.tierDict["Syntactic Clauses"].entryList
+        ] == [(first.start + first.end) / 2]
+        assert len(grid.tierDict["Syntactic Phrases"].entryList) == 1
+
+
 class TestSyntaxGrid:
     original_tier = get_test_tier(
         Path(__file__).parent.joinpath("data", "testgrid_pos.TextGrid")
@@ -177,3 +582,45 @@ class TestSyntaxGrid:
     def test_is_point(self):
         for tier in (self.tier_phrase, self.tier_clause):
             assert tier.tierType == POINT_TIER
+
+    def test_same_as_separate_tiers(self):
+        assert (
+            self.tier_clause.entryList
+            == create_clause_point_tier(self.original_tier).entryList
+        )
+        assert (
+            self.tier_phrase.entryList
+            == create_phrase_point_tier(self.original_tier).entryList
+        )
+
+    def test_array_tier(self):
+        grid = make_syntax_grid(ArrayTier.from_tier(self.original_tier), lang="en")
+        assert (
+            grid.tierDict["Syntactic Clauses"].entryList == self.tier_clause.entryList
+        )
+        assert (
+            grid.tierDict["Syntactic Phrases"].entryList == self.tier_phrase.entryList
+        )
+
+    def test_invalid_tags(self):
+        tier = self.original_tier.new(entryList=[(0, 1, "a_DT"), (1, 2, "a_XYZ")])
+        with pytest.raises(ValueError):
+            make_syntax_grid(tier, lang="en")
+
+    def test_parse_pos_label(self):
+        assert parse_pos_label("is_VB n't_RB") == ("VB", "RB")
+        assert parse_pos_label("") == ()
+        assert parse_pos_label("is_VB") is parse_pos_label("is_VB")
+
+    def test_labels_parsed_once(self):
+        parse_pos_label.cache_clear()
+        make_syntax_grid(self.original_tier, lang="en")
+        labels = {entry.label for entry in self.original_tier.entryList}
+        assert parse_pos_label.cache_info().misses == len(labels)
+        assert parse_pos_label.cache_info().hits == 0
+
+    def test_empty_tier(self):
+        tier = self.original_tier.new(entryList=[])
+        grid = make_syntax_grid(tier, lang="en")
+        assert grid.tierDict["Syntactic Clauses"].entryList == []
+        assert grid.tierDict["Syntactic Phrases"].entryList == []
@@ -0,0 +1,108 @@
+import socket
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from dynamicfluency.worker import *
+
+
+class TestRunScript:
+    def test_unknown_script(self, tmp_path):
+        response = run_script("os", {}, str(tmp_path))
+        assert response["output"] == ""
+        assert "Not a DynamicFluency script" in response["error"]
+
+    def test_error_is_returned(self, tmp_path):
+        response = run_script(
+            "dynamicfluency.scripts.get_database_columns",
+            {
+                "database": str(tmp_path),
+                "table_name": "missing",
+                "directory": str(tmp_path),
+            },
+            str(tmp_path),
+        )
+        assert response["error"] is not None
+
+
+class TestScriptStartup:
+    def test_no_heavy_imports(self):
+        # A call that is forwarded to the worker should not load anything it does not need.
+        code = (
+            "import sys\n"
+            "from dynamicfluency.worker import WORKER_SCRIPTS\n"
+            "for script in WORKER_SCRIPTS:\n"
+            "    __import__(script)\n"
+            "loaded = {'numpy', 'pandas', 'praatio', 'spacy', 'nltk'} & set(sys.modules)\n"
+            "assert not loaded, loaded\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+
+class TestOpenLookup:
+    def test_reopened_when_changed(self, tmp_path):
+        from dynamicfluency.frequency_store import write_frequency_store
+        from dynamicfluency.scripts.make_frequencytagged_girds_from_aligned_grids import (
+            open_lookup,
+        )
+
+        store = str(tmp_path / "store.dfstore")
+        lookups = []
+        for count in ("1", "22"):
+            write_frequency_store(
+                [{"WordForm": "a", "FREQcount": count}],
+                columns=["FREQcount"],
+                file=store,
+            )
+            lookup = open_lookup(str(tmp_path / "missing.db"), "Mock", store, False)
+            assert lookup is open_lookup(
+                str(tmp_path / "missing.db"), "Mock", store, False
+            )
+            assert lookup.get_rows(["a"])["a"]["FREQcount"] == count
+            lookups.append(lookup)
+        assert lookups[0] is not lookups[1]
+
+
+class TestWithoutUnixSockets:
+    def test_falls_back(self):
+        # As on Windows, where neither exists.
+        code = (
+            "import argparse, socket, socketserver\n"
+            "del socket.AF_UNIX, socketserver.UnixStreamServer\n"
+            "from dynamicfluency.worker import forward_to_worker, serve\n"
+            "assert not forward_to_worker('x', argparse.Namespace())\n"
+            "try:\n"
+            "    serve()\n"
+            "except OSError:\n"
+            "    pass\n"
+            "else:\n"
+            "    raise AssertionError\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+class TestWorker:
+    def test_no_worker(self, tmp_path):
+        assert request({"command": "ping"}, socket_path=tmp_path / "w.sock") is None
+
+    def test_ping_and_stop(self, tmp_path):
+        socket_path = tmp_path / "w.sock"
+        thread = threading.Thread(target=serve, args=(socket_path,))
+        thread.start()
+        for _ in range(100):
+            if request({"command": "ping"}, socket_path=socket_path) is not None:
+                break
+            thread.join(0.05)
+        else:
+            pytest.fail("Worker did not start")
+
+        with pytest.raises(OSError):
+            serve(socket_path)
+
+        request({"command": "stop"}, socket_path=socket_path)
+        thread.join(5)
+        assert not thread.is_alive()
+        assert not socket_path.exists()